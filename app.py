@@ -1,16 +1,85 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from src.vacationextender.core import VacationExtender
+from src.vacationextender.core import CancelToken, SharedProgress, solve
+from src.vacationextender.countries import supported_countries
 
+import os
 import json
+import time
 import toml
 import base64
+import weakref
 import datetime
-import holidays as hd
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 DEBUG = False
-
-supported_data = hd.list_supported_countries()
+# Solves running at once for the whole server; more requests wait in line
+MAX_CONCURRENT_SOLVES = os.cpu_count() or 2
+# Delay between reruns while a solve is running
+POLL_SECONDS = 0.5
+
+
+@st.cache_resource
+def solver_pool():
+    """
+    Worker processes shared by all sessions, so solves run in parallel
+    and the script thread never solves, with the manager through which
+    they report progress and are cancelled.
+    """
+    # Spawned: forking the threaded server is unsafe
+    context = multiprocessing.get_context("spawn")
+    return (ProcessPoolExecutor(max_workers=MAX_CONCURRENT_SOLVES,
+                                mp_context=context),
+            context.Manager())
+
+
+class SolveJob:
+    """
+    A solve running in the shared pool. A quick greedy plan is published
+    first as a provisional answer, while the configured engine reports
+    its progress until it finishes or is stopped: by the user, by a new
+    input, or when the session ends.
+    """
+    def __init__(self, config: dict):
+        pool, manager = solver_pool()
+        self.config = config
+        self.cancel = CancelToken(manager.Event())
+        self.progress = SharedProgress(manager)
+        self.greedy = pool.submit(solve, config, algorithm="greedy",
+                                  cancel=self.cancel)
+        self.future = pool.submit(solve, config, progress=self.progress,
+                                  cancel=self.cancel)
+        self._stop = weakref.finalize(self, SolveJob._cancel, self.cancel,
+                                      (self.greedy, self.future))
+
+    @staticmethod
+    def _cancel(cancel: CancelToken, futures):
+        for future in futures:
+            future.cancel()
+        cancel.cancel()
+
+    def stop(self):
+        self._stop()
+
+    @property
+    def fraction(self):
+        return self.progress.fraction
+
+    @property
+    def best(self):
+        return self.progress.best
+
+    @property
+    def provisional(self):
+        if self.greedy.done() and not self.greedy.cancelled() \
+                and self.greedy.exception() is None \
+                and self.greedy.result().plans:
+            return self.greedy.result()
+        return None
+
+
+supported_data = supported_countries()
 country_codes = sorted(supported_data.keys())
 
 curr_year = datetime.datetime.now().year
@@ -36,6 +105,10 @@ languages = {
         "top_n": "Number of suggestions in output",
         "button": "🚀 Optimize My Vacation",
         "loading": "Analyzing calendar and optimizing periods...",
+        "best_so_far": "Best so far: {best} days off",
+        "provisional": "Provisional plan (still optimizing):",
+        "cancel_btn": "Cancel",
+        "cancelled": "Optimization cancelled.",
         "success": "Optimization complete!",
         "table_header": "📅 Suggested Vacation Plan",
         "footer": "Made with ❤️ by André de Freitas Smaira",
@@ -135,6 +208,10 @@ languages = {
         "top_n": "Número de sugestões na saída",
         "button": "🚀 Otimizar Minhas Férias",
         "loading": "Analisando o calendário...",
+        "best_so_far": "Melhor até agora: {best} dias de folga",
+        "provisional": "Plano provisório (ainda otimizando):",
+        "cancel_btn": "Cancelar",
+        "cancelled": "Otimização cancelada.",
         "success": "Otimização concluída!",
         "table_header": "📅 Sugestão de Férias",
         "footer": "Feito com ❤️ por André de Freitas Smaira",
@@ -533,6 +610,7 @@ with st.sidebar:
         components.html(js_close, height=0, width=0)
 
 # --- CORE LOGIC ---
+keep_polling = False
 config_payload = {
     "CALENDAR": {"year": year, "weekend": [5, 6]},
     "LOCATION": {"country_code": country, "subdivision_code": subdivision, "include_observed": False},
@@ -555,11 +633,13 @@ config_payload = {
         "start_months": list(set(start_months)),
     },
     "ALGORITHM": {
-        "algorithm_type": "optimal"
+        "algorithm_type": "auto"
     }
 }
 
 try:
+    # Imported on demand: listing the countries does not need it
+    import holidays as hd
     base_hols = hd.country_holidays(
         country, subdiv=subdivision, years=year
     )
@@ -605,6 +685,13 @@ if st.button(
         height=0, width=0
     )
 
+# A solve of an older input is of no use: stop it
+job = st.session_state.get("solve_job")
+if job is not None and (not st.session_state.config_ready
+                        or job.config != config_payload):
+    job.stop()
+    st.session_state.solve_job = None
+
 if st.session_state.config_ready:
     b64_json = base64.b64encode(
         json.dumps(config_payload, indent=4, default=str).encode()
@@ -627,17 +714,37 @@ if st.session_state.config_ready:
             st.info(t["no_hols"])
 
     if st.button(t["button"], type="primary", use_container_width=True):
+        if st.session_state.get("solve_job") is not None:
+            st.session_state.solve_job.stop()
+        st.session_state.solve_job = SolveJob(config_payload)
+
+    job = st.session_state.get("solve_job")
+    if job is not None and not job.future.done():
+        st.progress(job.fraction,
+                    text=t["loading"] if job.best is None
+                    else t["best_so_far"].format(best=job.best))
+        if job.provisional is not None:
+            st.caption(t["provisional"])
+            st.code(str(job.provisional), language="text")
+        if st.button(t["cancel_btn"], key="cancel_solve"):
+            job.cancel.cancel()
+        keep_polling = True
+    elif job is not None:
+        st.session_state.solve_job = None
         try:
-            with st.spinner(t["loading"]):
-                ve = VacationExtender(config_data=config_payload)
-                ve.run()
-
+            result = job.future.result()
+            if result.cancelled:
+                st.warning(t["cancelled"])
+            else:
                 st.success(t["success"])
                 st.markdown(f"### {t['table_header']}")
                 if DEBUG:
                     st.code(str(config_payload), language="text")
+                    st.code(f"engine: {result.engine}\n"
+                            f"estimate: {result.cost_estimate}",
+                            language="text")
                 st.caption(t["caption"])
-                st.code(str(ve), language="text")
+                st.code(str(result), language="text")
 
         except Exception as e:
             st.error(f"{t['error']} {e}")
@@ -732,3 +839,8 @@ with st.expander(t['section_terms'], expanded=False):
     except FileNotFoundError:
         st.error("Legal docs not found.")
         st.markdown(f"[Ver Termos no GitHub](https://github.com/afsmaira/vacationExtender/blob/main/{t['terms_file']})")
+
+# Rerun until the background solve finishes, after the page is drawn
+if keep_polling:
+    time.sleep(POLL_SECONDS)
+    st.rerun()
@@ -1 +1,33 @@
-from .core import VacationExtender
\ No newline at end of file
+# Public names, imported on first access so that light entry points (the
+# CLI 'init' command, the country index) do not load the solver
+_EXPORTS = {
+    'CancelToken': 'core',
+    'Cancelled': 'core',
+    'Result': 'core',
+    'SharedProgress': 'core',
+    'VacationExtender': 'core',
+    'solve': 'core',
+    'CalendarDelta': 'fleet',
+    'ReplanReport': 'fleet',
+    'replan': 'fleet',
+    'AtlasReport': 'atlas',
+    'atlas_keys': 'atlas',
+    'sweep': 'atlas',
+    'Scenario': 'scenarios',
+    'scenario_grid': 'scenarios',
+    'solve_scenarios': 'scenarios',
+    'PlanEvaluation': 'evaluate',
+    'SpanEvaluation': 'evaluate',
+    'evaluate_plans': 'evaluate',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
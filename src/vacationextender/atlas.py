@@ -0,0 +1,198 @@
+import copy
+import csv
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import (Callable, Iterable, List, NamedTuple, Optional, Sequence,
+                    Set, Tuple)
+
+from .core import VacationExtender
+
+# (country, subdivision or None for national holidays only, year)
+AtlasKey = Tuple[str, Optional[str], int]
+
+CSV_FIELDS = ['country', 'subdivision', 'year', 'engine', 'pto', 'total',
+              'value', 'breaks', 'infeasible', 'error']
+
+
+class AtlasReport(NamedTuple):
+    """ Outcome of sweep(): keys solved now, already in the output, failed. """
+    written: List[AtlasKey]
+    skipped: List[AtlasKey]
+    failed: List[AtlasKey]
+
+
+def atlas_keys(years: Iterable[int],
+               countries: Optional[Iterable[str]] = None) -> List[AtlasKey]:
+    """
+    Every (country, subdivision, year) of the supported countries, or of
+    the given ones, the national calendar of each country included. Alias
+    codes (BRA for BR) are left out of the full sweep.
+    """
+    from .countries import supported_countries
+    supported = supported_countries()
+    codes = supported_countries(include_aliases=False) \
+        if countries is None else countries
+    keys = []
+    for code in codes:
+        for subdivision in [None] + list(supported.get(code, [])):
+            keys.extend((code, subdivision, year) for year in years)
+    return keys
+
+
+def key_config(base_config: dict, key: AtlasKey) -> dict:
+    """ Copy of base_config for the location and year of key. """
+    country, subdivision, year = key
+    config = copy.deepcopy(base_config)
+    location = config.setdefault('LOCATION', dict())
+    location['country_code'] = country
+    location['subdivision_code'] = subdivision
+    # Section read by VacationExtender for the year
+    config.setdefault('calendar', dict())['year'] = year
+    # Pool workers cannot start pools of their own
+    config.setdefault('ALGORITHM', dict())['workers'] = 1
+    return config
+
+
+def solve_key(base_config: dict, key: AtlasKey) -> dict:
+    """ Best plan of one key, as an output row. """
+    country, subdivision, year = key
+    row = {'country': country, 'subdivision': subdivision, 'year': year,
+           'engine': None, 'pto': 0, 'total': 0, 'value': 0,
+           'breaks': [], 'infeasible': [], 'error': None}
+    try:
+        result = VacationExtender(
+            config_data=key_config(base_config, key)).solve()
+    except Exception as err:
+        row['error'] = str(err)
+        return row
+    row['engine'] = result.engine
+    row['infeasible'] = result.infeasible
+    if result.plans:
+        plan = result.plans[0]
+        row['pto'] = sum(br.days_pto for br in plan)
+        row['total'] = sum(br.total for br in plan)
+        row['value'] = sum(br.value for br in plan)
+        row['breaks'] = [[br.begin.strftime('%Y-%m-%d'),
+                          br.end.strftime('%Y-%m-%d'),
+                          br.days_pto, br.total] for br in plan]
+    return row
+
+
+def _row_key(row: dict) -> AtlasKey:
+    return row['country'], row['subdivision'] or None, int(row['year'])
+
+
+def _is_csv(path: str) -> bool:
+    return path.lower().endswith('.csv')
+
+
+def finished_keys(output: str) -> Set[AtlasKey]:
+    """ Keys already written to a JSONL or CSV output. """
+    if not os.path.exists(output):
+        return set()
+    keys = set()
+    with open(output, newline='') as f:
+        if _is_csv(output):
+            # Fields missing from a row cut by an interruption are None
+            rows = [row for row in csv.DictReader(f)
+                    if row.get('error') is not None]
+        else:
+            rows = []
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    # Last line of an interrupted run
+                    continue
+        for row in rows:
+            try:
+                keys.add(_row_key(row))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return keys
+
+
+class _Writer:
+    """ Appends rows to a JSONL or CSV output, flushing every row. """
+    def __init__(self, output: str):
+        self.csv = _is_csv(output)
+        new = not os.path.exists(output) or os.path.getsize(output) == 0
+        if not new:
+            with open(output, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                ends_line = f.read(1) == b'\n'
+        self._file = open(output, 'a', newline='')
+        if not new and not ends_line:
+            # Row cut by an interruption: start the next one on a new line
+            self._file.write('\n')
+        if self.csv:
+            self._writer = csv.DictWriter(self._file, CSV_FIELDS)
+            if new:
+                self._writer.writeheader()
+
+    def write(self, row: dict):
+        if self.csv:
+            self._writer.writerow(dict(
+                row, subdivision=row['subdivision'] or '',
+                breaks=';'.join(f'{b}:{e}' for b, e, _, _ in row['breaks']),
+                infeasible='; '.join(row['infeasible']),
+                error=row['error'] or ''))
+        else:
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def sweep(base_config: dict, output: str, keys: Sequence[AtlasKey],
+          workers: int = None, resume: bool = True,
+          progress: Optional[Callable[[int, int], None]] = None) \
+        -> AtlasReport:
+    """
+    Solves base_config for every key in a process pool and appends one
+    row per key to output (CSV if it ends with .csv, JSONL otherwise) as
+    soon as it is solved. With resume, keys already in output are skipped,
+    so an interrupted sweep continues where it stopped.
+
+    Keys that failed are written with their error and not retried. Each
+    worker keeps its own calendar cache, and a holiday bundle set in
+    VACATIONEXT_HOLIDAY_BUNDLE is used by every worker. progress is called
+    with (done, total) after each key.
+    """
+    done = finished_keys(output) if resume else set()
+    if not resume and os.path.exists(output):
+        os.remove(output)
+    report = AtlasReport(list(), list(), list())
+    todo = []
+    for key in keys:
+        if key in done:
+            report.skipped.append(key)
+        else:
+            todo.append(key)
+    writer = _Writer(output)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(solve_key, base_config, key): key
+                       for key in todo}
+            try:
+                for i, future in enumerate(as_completed(futures)):
+                    row = future.result()
+                    writer.write(row)
+                    key = futures[future]
+                    if row['error'] is None:
+                        report.written.append(key)
+                    else:
+                        report.failed.append(key)
+                    if progress is not None:
+                        progress(i + 1, len(todo))
+            except BaseException:
+                # Do not wait for the queued keys: resume picks them up
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        writer.close()
+    return report
@@ -0,0 +1,149 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .mycalendar import CompactCalendar, FORBIDDEN, WORKING
+
+# (day index, scan directions, next day must be a working day)
+Seed = Tuple[int, Tuple[int, ...], bool]
+# (begin, end, begin_pto, end_pto, n_pto, n_holiday), as day indices, with
+# n_pto in PTO units of the calendar
+Span = Tuple[int, int, int, int, int, int]
+
+
+class Limits(NamedTuple):
+    """
+    Per-break filters applied while scanning outward from a seed: days
+    and the vac_break limits in PTO units, the total limits in days.
+    """
+    days: int
+    max_vac_break: int
+    min_vac_break: int
+    min_tot_break: int
+    max_tot_break: int
+    holiday_as_pto: bool
+
+
+def scan_seeds(calendar: CompactCalendar, seeds: Sequence[Seed],
+               limits: Limits) -> List[Span]:
+    """
+    Scans outward from every seed and returns the spans that pass the
+    per-break limits, in discovery order (duplicates included).
+    """
+    n = len(calendar)
+    types = calendar.types
+    spans: List[Span] = []
+    for beg_day, steps, test_working in seeds:
+        # A custom holiday can also be a forced work day
+        if not 0 <= beg_day < n or types[beg_day] == FORBIDDEN:
+            continue
+        # Days before and after
+        for f in steps:
+            # Anchors may be a break of their own day only
+            day = beg_day + f if test_working else beg_day
+            if not 0 <= day < n:
+                continue
+            if (not test_working) or types[day] == WORKING:
+                while 0 <= day < n:
+                    if types[day] == FORBIDDEN:
+                        break
+                    span = calendar.span(min(beg_day, day),
+                                         max(beg_day, day),
+                                         limits.holiday_as_pto)
+                    if span is None:
+                        day += f
+                        continue
+                    n_pto, total = span[4], span[1] - span[0] + 1
+                    if n_pto > limits.days:
+                        break
+                    if n_pto > limits.max_vac_break:
+                        break
+                    if n_pto < limits.min_vac_break:
+                        day += f
+                        continue
+                    if total < limits.min_tot_break:
+                        day += f
+                        continue
+                    if total > limits.max_tot_break:
+                        break
+                    spans.append(span)
+                    day += f
+    return spans
+
+
+_worker_calendar: Optional[CompactCalendar] = None
+
+
+def _init_worker(calendar: CompactCalendar):
+    global _worker_calendar
+    _worker_calendar = calendar
+
+
+def _scan_chunk(args: Tuple[Sequence[Seed], Limits]) -> List[Span]:
+    seeds, limits = args
+    return scan_seeds(_worker_calendar, seeds, limits)
+
+
+def generate_candidates(calendar: CompactCalendar, seeds: Sequence[Seed],
+                        limits: Limits, workers: int = 1) -> List[Span]:
+    """
+    Generates the deduplicated candidate spans of all seeds.
+
+    With workers > 1 the seeds are split into contiguous chunks scanned by
+    a process pool; every worker receives the compact calendar once. The
+    chunks are merged in order, so the result is the same as the serial
+    scan.
+    """
+    if workers <= 1 or len(seeds) < 2 * workers:
+        chunks_spans = [scan_seeds(calendar, seeds, limits)]
+    else:
+        n_chunks = 4 * workers
+        size = -(-len(seeds) // n_chunks)
+        chunks = [(seeds[i:i + size], limits)
+                  for i in range(0, len(seeds), size)]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(calendar,)) as executor:
+            chunks_spans = list(executor.map(_scan_chunk, chunks))
+    seen = set()
+    spans: List[Span] = []
+    for chunk in chunks_spans:
+        for span in chunk:
+            if span[:2] not in seen:
+                seen.add(span[:2])
+                spans.append(span)
+    return spans
+
+
+def loosest(limits: Sequence[Limits]) -> Limits:
+    """ Limits whose scan finds every span found under any of limits. """
+    return Limits(max(lim.days for lim in limits),
+                  max(lim.max_vac_break for lim in limits),
+                  min(lim.min_vac_break for lim in limits),
+                  min(lim.min_tot_break for lim in limits),
+                  max(lim.max_tot_break for lim in limits),
+                  all(lim.holiday_as_pto for lim in limits))
+
+
+def measure(calendar: CompactCalendar, spans: Sequence[Span],
+            holiday_as_pto: bool) -> List[Span]:
+    """ The same spans, with holidays inside counted as PTO or not. """
+    return [calendar.span(span[0], span[1], holiday_as_pto)
+            for span in spans]
+
+
+def restrict(spans: Sequence[Span], limits: Limits) -> List[Span]:
+    """
+    The spans generate_candidates would return for limits, taken from the
+    spans of the same seeds under looser limits. spans must be measured
+    with limits.holiday_as_pto (see measure()).
+
+    This works because PTO and total days only grow as a scan moves away
+    from its seed, so a span passing limits was reached by the stricter
+    scan too.
+    """
+    max_pto = min(limits.days, limits.max_vac_break)
+    return [span for span in spans
+            if limits.min_vac_break <= span[4] <= max_pto
+            and limits.min_tot_break <= span[1] - span[0] + 1
+            <= limits.max_tot_break]
+
@@ -1,23 +1,124 @@
 import json
+import math
 import re
-import heapq
-import toml
 import bisect
 
+import random
+import threading
+import time
+
+from collections import defaultdict
 from datetime import date, timedelta
-from typing import Dict, Any, List, Tuple, Union
-from .mycalendar import Calendar, Break
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, \
+    Union
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
 
-class VacationExtender:
-    def __init__(self, config_file: str = None, config_data: dict = None):
-        if config_data:
-            self.config = config_data
-        else:
-            self.config = self._load_config(config_file)
-        self._process_config()
-        self.breaks = list()
-        self.selected_breaks = list()
+from .mycalendar import CALENDAR_CACHE, Calendar, Break, Roster
+from .candidates import Limits, Seed, Span, generate_candidates
+from .daydp import solve_days
+from .split import Item, solve_split
+from .structures import IndexedHeap, IntervalSet, SpanIndex
+from .window import WindowIndex
+
+# Rough cost model of the optimal DP, calibrated on a one-year BR config:
+# one unit is one (candidate, PTO, period, kept solution) cell visit.
+SECONDS_PER_DP_UNIT = 4e-7
+# Growth of the DP when anchors, mandatory days or months are set: the
+# _satisfied counts split each (PTO, periods) state, by 1.4-5.7x on the
+# sample configs whatever their number (more constraints prune more paths)
+DP_CONSTRAINED_BLOWUP = 3.0
+# Same for the day-indexed DP: one unit is one (calendar day, PTO, period,
+# kept solution) cell visit
+SECONDS_PER_DAY_DP_UNIT = 6e-7
+# Process start-up and table transfer of the split solve
+SPLIT_OVERHEAD_SECONDS = 0.3
+# Random restarts without improvement after which the LNS engine stops
+LNS_MAX_KICKS = 10
+# Undone selections after which the greedy engine keeps its best plan
+GREEDY_MAX_UNDOS = 1000
+# Seconds between the progress reports of the optimal engine
+PROGRESS_SECONDS = 0.1
+# Seconds between the reports a SharedProgress sends to its manager
+SHARED_PROGRESS_SECONDS = 0.2
+
+
+# progress(fraction of the candidates processed, best score so far)
+Progress = Callable[[float, Optional[float]], None]
+
+
+class Cancelled(Exception):
+    """ Raised inside an engine when its CancelToken is cancelled. """
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag, safe to set from another thread, or
+    from another process when event is a multiprocessing.Manager Event.
+    Engines check it once per DP row or greedy pop.
+    """
+    def __init__(self, event=None):
+        self._event = threading.Event() if event is None else event
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+
+class SharedProgress:
+    """
+    Progress callback that can be sent to another process: the latest
+    report is kept in a dict of a multiprocessing.Manager, updated at
+    most every SHARED_PROGRESS_SECONDS, and read back with fraction and
+    best.
+    """
+    def __init__(self, manager):
+        self._state = manager.dict(fraction=0.0, best=None)
+        self._sent = 0.0
+
+    def __call__(self, fraction: float, best: Optional[float]):
+        now = time.monotonic()
+        if now - self._sent >= SHARED_PROGRESS_SECONDS or fraction >= 1:
+            self._sent = now
+            self._state.update(fraction=min(fraction, 1.0), best=best)
+
+    @property
+    def fraction(self) -> float:
+        return self._state['fraction']
+
+    @property
+    def best(self) -> Optional[float]:
+        return self._state['best']
+
+
+class Result:
+    """ Plans found by one solve, with how they were found. """
+    def __init__(self, plans: List[List[Break]], engine: Optional[str],
+                 cost_estimate: Optional[Dict[str, float]],
+                 infeasible: List[str], days: int, top_n: int,
+                 cancelled: bool = False,
+                 race: Dict[str, Tuple[Optional[float], Optional[float],
+                                       Optional[str]]] = None):
+        self.plans = plans
+        self.engine = engine
+        self.cost_estimate = cost_estimate
+        self.infeasible = infeasible
+        self.days = days
+        self.top_n = top_n
+        self.cancelled = cancelled
+        # 'portfolio' only: engine -> (seconds, value of its best plan,
+        # error that stopped it)
+        self.race = race
 
     def __str__(self):
         """Returns all selected vacation bridges in a table."""
@@ -28,9 +129,9 @@ class VacationExtender:
         SEPARATOR = "-" * N_SEP + '\n'
 
         ret = ''
-        for i, selected_break in enumerate(self.selected_breaks[:self._top_n]):
+        for i, selected_break in enumerate(self.plans[:self.top_n]):
             ret += "\n" + "=" * N_SEP + '\n'
-            if self.algorithm == 'greedy' or self._top_n == 1:
+            if self.engine in ('greedy', 'lns') or self.top_n == 1:
                 ret += f"🌴 EXTENDED VACATION 📅\n"
             else:
                 ret += f"🌴 EXTENDED VACATION (suggestion {i + 1}) 📅\n"
@@ -43,6 +144,7 @@ class VacationExtender:
 
             total_pto_used = 0
             total_days_gained = 0
+            total_value = 0
 
             for br in selected_break:
                 start_date_str = br.begin.strftime("%Y-%m-%d")
@@ -63,28 +165,71 @@ class VacationExtender:
 
                 total_pto_used += br.days_pto
                 total_days_gained += br.total
+                total_value += br.value
 
             ret += SEPARATOR
 
-            ret += f"USED PTO: {total_pto_used} / {self.days}\n"
+            ret += f"USED PTO: {total_pto_used:g} / {self.days:g}\n"
             ret += f"TOTAL BREAK DAYS: {total_days_gained}\n"
             ret += f"AVERAGE ROI: {total_days_gained / total_pto_used:.2f} break days / PTO days\n"
+            if total_value != total_days_gained:
+                ret += f"WEIGHTED VALUE: {total_value:.2f}\n"
             ret += "=" * N_SEP + '\n'
 
-        if len(ret) == 0:
+        if len(ret) == 0 and self.cancelled:
+            ret = 'Search cancelled before finishing.'
+        elif len(ret) == 0:
             ret = 'No possible vacation that follows all conditions chosen!'
+            for reason in self.infeasible:
+                ret += f"\n - {reason}"
         return ret
 
-    def _load_config(self, file_path: str) -> Dict[str, Any]:
+
+class VacationExtender:
+    """
+    Vacation planner for one configuration.
+
+    Everything derived from the configuration (calendar, anchors and, after
+    prepare(), the candidate breaks) is computed once and never modified,
+    so solve() can be called repeatedly, and from several threads, on the
+    same instance. run() is the single-shot wrapper used by the CLI.
+    """
+    def __init__(self, config_file: str = None, config_data: dict = None,
+                 calendar: Calendar = None):
+        if config_data:
+            self.config = config_data
+        else:
+            self.config = self._load_config(config_file)
+        self._process_config(calendar)
+        self.candidates: Optional[Tuple[Break, ...]] = None
+        self._window_index: Optional[WindowIndex] = None
+        self._prepare_lock = threading.Lock()
+        self.breaks = list()
+        self.selected_breaks = list()
+        self.result: Optional[Result] = None
+
+    def __str__(self):
+        if self.result is None:
+            return 'No possible vacation that follows all conditions chosen!'
+        return str(self.result)
+
+    @staticmethod
+    def _load_config(file_path: str) -> Dict[str, Any]:
         """Reads and processes the configuration file (TOML format)."""
         if file_path is None:
             return dict()
+        if tomllib is not None:
+            load, mode, decode_error = \
+                tomllib.load, 'rb', tomllib.TOMLDecodeError
+        else:
+            import toml
+            load, mode, decode_error = toml.load, 'r', toml.TomlDecodeError
         try:
-            with open(file_path, 'r') as f:
-                return toml.load(f)
+            with open(file_path, mode) as f:
+                return load(f)
         except FileNotFoundError:
             raise Exception(f"Configuration file not found at: {file_path}")
-        except toml.TomlDecodeError:
+        except decode_error:
             raise Exception("Error decoding TOML file. Check syntax.")
 
     def export_config(self, file_path: str = 'config.json'):
@@ -105,8 +250,11 @@ class VacationExtender:
                 "min_vac_days_per_break": self.min_vac_break,
                 "max_vac_days_per_break": self.max_vac_break,
                 "min_gap_days": self.min_gap,
+                "pto_unit": self.pto_unit,
+                "half_days": sorted(self.half_days),
                 "top_n_suggestions": self.top_n,
                 "custom_holidays": self.custom_holidays,
+                "removed_holidays": sorted(self.removed_holidays),
                 "forced_work": self.forbidden,
                 "must_be_vacation": self.must_be,
                 "must_start_on": self.start_days,
@@ -114,8 +262,20 @@ class VacationExtender:
                 "required_months": self.months
             },
             "ALGORITHM": {
-                "algorithm_type": self.algorithm
-            }
+                "algorithm_type": self.algorithm,
+                "accuracy": self.accuracy,
+                "max_seconds": self.max_seconds,
+                "duration_weight_factor_alpha": self.alpha,
+                "workers": self.workers,
+                "lns_seconds": self.lns_seconds,
+                "seed": self.seed,
+                "portfolio_engines": self.portfolio
+            },
+            "ROSTER": {} if self.roster is None else {
+                "pattern": self.roster.pattern,
+                "anchor": self.roster.anchor},
+            "WEIGHTS": {day.isoformat(): weight
+                        for day, weight in sorted(self.day_weights.items())}
         }, open(file_path, 'w'), indent=4, default=str)
 
     def _str2date(self, dates: List[Union[str, date]]) -> List[date]:
@@ -146,13 +306,13 @@ class VacationExtender:
                 print(f"⚠️ WARNING: Unrecognized format: '{item}'. Expected 'YYYY-MM-DD' or 'YYYY-MM-DD:YYYY-MM-DD'")
         return all_dates
 
-    def _process_config(self):
-        calendar = self.config.get('calendar', dict())
+    def _process_config(self, calendar: Calendar = None):
+        calendar_cfg = self.config.get('calendar', dict())
         today = date.today()
-        self.year = calendar.get('year', today.year + 1)
+        self.year = calendar_cfg.get('year', today.year + 1)
         first_day = max(today, date(self.year, 1, 1))
         last_day = date(self.year, 12, 31)
-        self.weekend = calendar.get('weekend', [5, 6])
+        self.weekend = calendar_cfg.get('weekend', [5, 6])
         location = self.config.get('LOCATION', dict())
         self.country = location.get('country_code', "BR")
         self.state = location.get('subdivision_code', "SP")
@@ -164,7 +324,12 @@ class VacationExtender:
                                              self.days)
         if self.max_vac_break <= 0:
             self.max_vac_break = self.days
-        self.min_vac_break = constraints.get('min_vac_days_per_break', 1)
+        # Fractions of a day: half days, or any leave, in units of pto_unit
+        self.pto_unit = constraints.get('pto_unit', 1)
+        self.half_days = constraints.get('half_days', list())
+        self.half_days = set(self._str2date(self.half_days))
+        self.min_vac_break = constraints.get('min_vac_days_per_break',
+                                             min(self.pto_unit, 1))
         self.min_tot_break = constraints.get('min_total_days_off', 1)
         self.max_tot_break = constraints.get('max_total_days_off', 999999)
         if self.max_tot_break <= 0:
@@ -175,13 +340,41 @@ class VacationExtender:
         self.top_n = self._top_n * 5
         self.custom_holidays = constraints.get('custom_holidays', list())
         self.custom_holidays = self._str2date(self.custom_holidays)
+        # Library holidays that are working days (moved or revoked)
+        self.removed_holidays = constraints.get('removed_holidays', list())
+        self.removed_holidays = set(self._str2date(self.removed_holidays))
         self.forbidden = constraints.get('forced_work', list())
         self.forbidden = self._str2date(self.forbidden)
         self.forbidden = set(self.forbidden)
-        self.calendar = Calendar(self.country, self.state,
-                                 first_day, last_day,
-                                 self.weekend, self.custom_holidays,
-                                 self.forbidden)
+        # Shift roster replacing the weekend as rest days. The cycle starts
+        # on January 1st by default, not on first_day: the phase must not
+        # depend on the day the plan is made
+        roster = self.config.get('ROSTER', dict())
+        anchor = roster.get('anchor', date(self.year, 1, 1).isoformat())
+        self.roster = Roster(roster['pattern'],
+                             self._str2date([anchor])[0]) \
+            if roster.get('pattern') else None
+        if calendar is None:
+            calendar = CALENDAR_CACHE.get(self.country, self.state,
+                                          first_day, last_day,
+                                          self.weekend, self.custom_holidays,
+                                          self.forbidden, self.roster,
+                                          self.half_days, self.pto_unit,
+                                          self.removed_holidays)
+        else:
+            if self.roster is not None and calendar.roster != self.roster:
+                calendar = calendar.with_roster(self.roster)
+            if calendar.pto_unit != self.pto_unit \
+                    or calendar.half_days != self.half_days:
+                calendar = calendar.with_pto_unit(self.pto_unit,
+                                                  self.half_days)
+        self.calendar = calendar
+        # The engines count PTO in steps: the largest number of units
+        # dividing the budget and the PTO of every day, so a pto_unit
+        # finer than the days and budget need costs nothing
+        units = self._units(self.days)
+        self._step = math.gcd(calendar.compact().pto_step, units)
+        self.budget = units // self._step
         self.must_be = constraints.get('must_be_vacation', list())
         self.must_be = self._str2date(self.must_be)
         self.start_days = constraints.get('must_start_on', list())
@@ -193,100 +386,341 @@ class VacationExtender:
         self.end_days.sort()
         self.must_be.extend(self.end_days)
         self.must_be = list(sorted(set(self.must_be)))
+        dDay = timedelta(days=1)
+        # Anchors moved over adjacent holidays, as candidate breaks are
+        self.start_anchors = list(self.start_days)
+        for i in range(len(self.start_anchors)):
+            while self.start_anchors[i] - dDay in self.calendar \
+                    and self.calendar[self.start_anchors[i] - dDay].is_holiday():
+                self.start_anchors[i] -= dDay
+        self.end_anchors = list(self.end_days)
+        for i in range(len(self.end_anchors)):
+            while self.end_anchors[i] + dDay in self.calendar \
+                    and self.calendar[self.end_anchors[i] + dDay].is_holiday():
+                self.end_anchors[i] += dDay
         self.months = constraints.get('required_months', list())
         self.months = list(sorted(set(self.months)))
         self.start_months = constraints.get('start_months', list())
         self.start_months = list(sorted(set(self.start_months)))
         algorithm = self.config.get('ALGORITHM', dict())
-        self.algorithm = algorithm.get('algorithm', 'optimal')
+        self.algorithm = algorithm.get('algorithm_type',
+                                       algorithm.get('algorithm', 'optimal'))
+        self.accuracy = algorithm.get('accuracy', 'exact')
+        self.max_seconds = algorithm.get('max_seconds', 10)
         self.alpha = algorithm.get('duration_weight_factor_alpha', 0.5)
+        self.workers = algorithm.get('workers', 1)
+        self.lns_seconds = algorithm.get('lns_seconds', 1.0)
+        self.seed = algorithm.get('seed', 0)
+        self.portfolio = algorithm.get('portfolio_engines',
+                                       ['optimal', 'day_dp', 'greedy', 'lns'])
+        # Value of each day off, 1.0 unless weighted
+        self.day_weights: Dict[date, float] = dict()
+        for dates, weight in self.config.get('WEIGHTS', dict()).items():
+            for day in self._str2date([dates]):
+                self.day_weights[day] = float(weight)
+        self.weights = self.calendar.day_weights(self.day_weights) \
+            if self.day_weights else None
 
-    def run(self):
-        self._preprocess()
-        if self.algorithm == 'optimal':
-            self.breaks = list(sorted(br[-1] for br in self.breaks))
-            self._run_optimal()
+    def run(self, progress: Progress = None, cancel: CancelToken = None):
+        """
+        Solves the configuration and keeps the result on the instance.
+        progress is called with the fraction of candidates processed and
+        the best score so far; cancel stops the search early.
+        """
+        self.result = self.solve(progress=progress, cancel=cancel)
+        self.breaks = list(self.candidates or [])
+        self.selected_breaks = self.result.plans
+
+    def prepare(self, spans: Sequence[Span] = None) -> Tuple[Break, ...]:
+        """
+        Generates, once per instance, the candidate breaks shared by every
+        solve, sorted by end date. spans, when given, are the candidate
+        spans already generated for this calendar, seeds and limits (see
+        scenarios.solve_scenarios).
+        """
+        with self._prepare_lock:
+            if self.candidates is None:
+                self.candidates = tuple(
+                    self._filter_anchored(sorted(self._preprocess(spans))))
+        return self.candidates
+
+    def best_in_window(self, start: date, end: date, budget: float = None,
+                       periods: int = 1) -> Result:
+        """
+        Best plan inside [start, end] spending at most budget PTO days
+        (vacation_days by default) in at most periods breaks. Only the
+        per-break limits and min_gap_days apply. The index behind it is
+        built once per instance, so repeated single-break queries are
+        cheap; multi-break ones run the DP on the window's candidates.
+        """
+        budget = self.days if budget is None else budget
+        breaks = self.prepare()
+        solution = self._get_window_index(breaks).best_plan(
+            start.toordinal(), end.toordinal(),
+            self._units(budget, round_up=False) // self._step, periods)
+        plans = [] if solution is None \
+            else [[breaks[i] for i in reversed(solution[1])]]
+        return Result(plans, 'window', None, [], budget, 1)
+
+    def _get_window_index(self, breaks: Sequence[Break]) -> WindowIndex:
+        with self._prepare_lock:
+            if self._window_index is None:
+                self._window_index = WindowIndex(
+                    self._items(breaks),
+                    max((br.cost for br in breaks), default=0),
+                    self.min_gap)
+        return self._window_index
+
+    def solve(self, algorithm: str = None, progress: Progress = None,
+              cancel: CancelToken = None) -> Result:
+        """
+        Finds the best plans without modifying the instance (besides the
+        one-time prepare()). algorithm overrides ALGORITHM.algorithm_type;
+        progress and cancel are as in run(). A cancelled search returns a
+        Result with cancelled set and no plans.
+        """
+        algorithm = algorithm or self.algorithm
+        infeasible = self._check_config()
+        if infeasible:
+            return Result([], None, None, infeasible, self.days, self._top_n)
+        if algorithm == 'day_dp':
+            if self._day_dp_applies():
+                infeasible = self._check_pto_range(
+                    max(self.min_vac_break, self.pto_unit),
+                    min(self.max_vac_break, self.days))
+                if infeasible:
+                    return Result([], algorithm, None, infeasible, self.days,
+                                  self._top_n)
+                try:
+                    plans = self._run_day_dp(progress, cancel)
+                except Cancelled:
+                    return Result([], algorithm, None, [], self.days,
+                                  self._top_n, cancelled=True)
+                return Result(plans, algorithm, None, [], self.days,
+                              self._top_n)
+            algorithm = 'optimal'
+        breaks = self.prepare()
+        infeasible = self._check_candidates(breaks)
+        if infeasible:
+            return Result([], None, None, infeasible, self.days, self._top_n)
+        cost_estimate = self._estimate_cost(breaks)
+        if algorithm == 'auto':
+            engine = self._select_engine(cost_estimate)
         else:
-            self._run_greedy()
+            engine = algorithm
+        infeasible = self._check_budget(breaks)
+        if infeasible:
+            return Result([], engine, cost_estimate, infeasible,
+                          self.days, self._top_n)
+        if engine == 'portfolio':
+            # Imported here: the portfolio module builds on this one
+            from .portfolio import race
+            return race(self, breaks, cost_estimate, progress, cancel)
+        try:
+            if engine == 'optimal':
+                plans = self._run_optimal(breaks, progress, cancel)
+            elif engine == 'day_dp':
+                plans = self._run_day_dp(progress, cancel)
+            elif engine == 'lns':
+                plans = self._run_lns(breaks, progress, cancel)
+            else:
+                plans = self._run_greedy(breaks, progress, cancel)
+        except Cancelled:
+            return Result([], engine, cost_estimate, [],
+                          self.days, self._top_n, cancelled=True)
+        return Result(plans, engine, cost_estimate, [],
+                      self.days, self._top_n)
 
-    def pq_add(self, br: Break):
-        br.times_tried += 1
-        item = (br.times_tried,
-                -br.w_roi, -br.total, br.days_pto, br
-                )
-        if item not in self.breaks:
-            heapq.heappush(self.breaks, item)
+    def _check_config(self) -> List[str]:
+        """
+        Finds constraints that can never be met together, before any
+        candidate is generated. Returns one message per conflict.
+        """
+        reasons = []
+        for name, values in (('must_start_on', self.start_days),
+                             ('must_end_on', self.end_days),
+                             ('required_months', self.months),
+                             ('start_months', self.start_months)):
+            if len(set(values)) > self.n_breaks:
+                reasons.append(f"{name} needs {len(set(values))} periods "
+                               f"but max_vac_periods is {self.n_breaks}")
+        for name, days in (('must_start_on', self.start_days),
+                           ('must_end_on', self.end_days),
+                           ('must_be_vacation', self.must_be)):
+            for day in sorted(set(days)):
+                if day not in self.calendar:
+                    reasons.append(f"{name} date {day} is outside the "
+                                   f"calendar ({self.calendar.first_date.day}"
+                                   f" to {self.calendar.last_date.day})")
+                elif day in self.forbidden:
+                    reasons.append(f"{name} date {day} is in forced_work")
+        # Every day costs a multiple of pto_step units: other budgets can
+        # never be spent exactly
+        compact = self.calendar.compact()
+        if self._units(self.days) % compact.pto_step:
+            unit = 'half' if compact.halves else 'whole'
+            reasons.append(f"vacation_days {self.days} cannot be spent in "
+                           f"{unit} days off")
+        return reasons
 
-    def pq_pop(self):
-        return heapq.heappop(self.breaks)[-1]
+    def _filter_anchored(self, breaks: List[Break]) -> List[Break]:
+        """
+        Drops candidates containing a must_start_on (must_end_on) date
+        without starting (ending) on it: the break that must start (end)
+        there would overlap them.
+        """
+        if not (self.start_anchors or self.end_anchors):
+            return breaks
+        starts, ends = set(self.start_anchors), set(self.end_anchors)
 
-    def _preprocess(self):
-        """ Preprocesses the data. """
-        dDay = timedelta(days=1)
+        def compatible(br: Break) -> bool:
+            begin, end = br.begin.date(), br.end.date()
+            day = begin
+            while day <= end:
+                if (day in starts and day != begin) \
+                        or (day in ends and day != end):
+                    return False
+                day += timedelta(days=1)
+            return True
+
+        return [br for br in breaks if compatible(br)]
+
+    def _check_candidates(self, breaks: Sequence[Break]) -> List[str]:
+        """
+        Finds anchors, mandatory days and months that no candidate break
+        can satisfy, and anchor sets whose cheapest breaks exceed the
+        budget.
+        """
+        reasons = []
+        for name, days, ok in (
+                ('must_start_on', self.start_anchors,
+                 lambda br, d: br.begin == d),
+                ('must_end_on', self.end_anchors,
+                 lambda br, d: br.end == d),
+                ('required_months', self.months,
+                 lambda br, m: br.begin.date().month == m
+                 and br.end.date().month == m),
+                ('start_months', self.start_months,
+                 lambda br, m: br.begin.date().month == m)):
+            min_pto = 0
+            for value in sorted(set(days)):
+                ptos = [br.days_pto for br in breaks if ok(br, value)]
+                if not ptos:
+                    reasons.append(f"no break within the per-break limits "
+                                   f"satisfies {name} {value}")
+                    continue
+                min_pto += min(ptos)
+            if min_pto > self.days:
+                reasons.append(f"{name} needs at least {min_pto} PTO days "
+                               f"but vacation_days is {self.days}")
+        for day in self.must_be:
+            if not any(day in br for br in breaks):
+                reasons.append(f"no break within the per-break limits "
+                               f"contains must_be_vacation {day}")
+        return reasons
 
-        for i in range(len(self.start_days)):
-            while self.start_days[i] - dDay in self.calendar \
-                    and self.calendar[self.start_days[i] - dDay].is_holiday():
-                self.start_days[i] -= dDay
+    def _check_budget(self, breaks: Sequence[Break]) -> List[str]:
+        """
+        Every engine spends exactly vacation_days in at most (the exact
+        ones: exactly) max_vac_periods periods: checks the candidates' PTO
+        range allows it.
+        """
+        if not breaks:
+            return ["no break fits the per-break limits"]
+        return self._check_pto_range(min(br.days_pto for br in breaks),
+                                     max(br.days_pto for br in breaks))
 
-        for i in range(len(self.end_days)):
-            while self.end_days[i] + dDay in self.calendar \
-                    and self.calendar[self.end_days[i] + dDay].is_holiday():
-                self.end_days[i] += dDay
+    def _check_pto_range(self, min_pto: float, max_pto: float) -> List[str]:
+        """ _check_budget for breaks of min_pto to max_pto PTO days. """
+        if self.n_breaks * min_pto > self.days:
+            return [f"{self.n_breaks} periods of at least {min_pto} PTO "
+                    f"days exceed vacation_days ({self.days})"]
+        if self.n_breaks * max_pto < self.days:
+            return [f"{self.n_breaks} periods of at most {max_pto} PTO "
+                    f"days cannot spend vacation_days ({self.days})"]
+        return []
 
+    def _estimate_cost(self, breaks: Sequence[Break]) -> Dict[str, float]:
+        """
+        Estimates the cost of the optimal DP on the current candidates,
+        and of the day-indexed DP when it applies.
+        """
+        units = len(breaks) * (self.budget + 1) * self.n_breaks * self.top_n
+        if self._has_path_constraints():
+            units *= DP_CONSTRAINED_BLOWUP
+        seconds = units * SECONDS_PER_DP_UNIT
+        if self.workers > 1 and not self._has_path_constraints():
+            seconds = seconds / 2 + SPLIT_OVERHEAD_SECONDS
+        estimate = {'candidates': len(breaks),
+                    'units': units,
+                    'seconds': seconds}
+        if self._day_dp_applies():
+            day_units = len(self.calendar.compact().types) \
+                * (self.budget + 1) * self.n_breaks * self.top_n
+            estimate['day_dp_units'] = day_units
+            estimate['day_dp_seconds'] = day_units * SECONDS_PER_DAY_DP_UNIT
+        return estimate
+
+    def _select_engine(self, cost_estimate: Dict[str, float]) -> str:
+        """
+        Picks the cheapest engine meeting the accuracy and latency targets:
+        the faster of 'optimal' and 'day_dp' (when it applies) when an
+        exact answer is required and expected within max_seconds, 'lns'
+        when it is required but too slow, 'greedy' otherwise.
+        """
+        if self.accuracy == 'exact':
+            engine, seconds = 'optimal', cost_estimate['seconds']
+            if cost_estimate.get('day_dp_seconds', seconds) < seconds:
+                engine, seconds = 'day_dp', cost_estimate['day_dp_seconds']
+            if seconds <= self.max_seconds:
+                return engine
+            return 'lns'
+        return 'greedy'
+
+    def seeds(self) -> List[Seed]:
+        """ Days the candidate breaks are scanned from: holidays and anchors. """
         # day, steps, test next day is working day
-        process_list = [(h, [-1, 1], True) for h in self.calendar.holidays()]
-        process_list += [(d, [1], False) for d in self.start_days]
-        process_list += [(d, [-1], False) for d in self.end_days]
-        for beg_day, steps, test_working in process_list:
-            if beg_day not in self.calendar:
-                continue
-            # Days before and after
-            for f in steps:
-                day = beg_day + f * dDay
-                if day not in self.calendar:
-                    br = self.calendar.new_break(
-                        beg_day, beg_day,
-                        self.holiday_as_pto,
-                        self.alpha
-                    )
-                    if br is not None:
-                        self.pq_add(br)
-                    break
-                if (not test_working) \
-                        or self.calendar[day].is_working():
-                    while day in self.calendar:
-                        if self.calendar[day].is_forbidden():
-                            break
-                        break_lims = (
-                            min(beg_day, day),
-                            max(beg_day, day)
-                        )
-                        br = self.calendar.new_break(
-                            break_lims[0], break_lims[1],
-                            self.holiday_as_pto,
-                            self.alpha
-                        )
-                        if br is None:
-                            day += f * dDay
-                            continue
-                        if br.days_pto > self.days:
-                            break
-                        if br.days_pto > self.max_vac_break:
-                            break
-                        if br.days_pto < self.min_vac_break:
-                            day += f * dDay
-                            continue
-                        if br.total < self.min_tot_break:
-                            day += f * dDay
-                            continue
-                        if br.total > self.max_tot_break:
-                            break
-                        self.pq_add(br)
-                        day += f * dDay
-
-    def _prev_break(self, i, all_ends):
-        max_date = self.breaks[i].begin.date() - timedelta(days=self.min_gap)
+        compact = self.calendar.compact()
+        seeds = [(compact.index(h), (-1, 1), True)
+                 for h in self.calendar.holidays()]
+        seeds += [(compact.index(d), (1,), False) for d in self.start_anchors]
+        seeds += [(compact.index(d), (-1,), False) for d in self.end_anchors]
+        return seeds
+
+    def limits(self) -> Limits:
+        return Limits(self._units(self.days),
+                      self._units(self.max_vac_break, round_up=False),
+                      self._units(self.min_vac_break, round_up=True),
+                      self.min_tot_break, self.max_tot_break,
+                      self.holiday_as_pto)
+
+    def _units(self, days: float, round_up: bool = None) -> int:
+        """
+        days of PTO in units of the calendar. A number of days that is
+        not a whole number of units raises ValueError, unless round_up
+        says which way to round it (per-break limits are bounds).
+        """
+        units = days * self.calendar.compact().units_per_day
+        whole = round(units)
+        if abs(units - whole) < 1e-9:
+            return whole
+        if round_up is None:
+            raise ValueError(f"{days} PTO days is not a multiple of "
+                             f"pto_unit ({self.pto_unit})")
+        return math.ceil(units) if round_up else math.floor(units)
+
+    def _preprocess(self, spans: Sequence[Span] = None) -> List[Break]:
+        """ Generates the candidate breaks around holidays and anchors. """
+        compact = self.calendar.compact()
+        if spans is None:
+            spans = generate_candidates(compact, self.seeds(), self.limits(),
+                                        self.workers)
+        return [self.calendar.make_break(span, self.alpha, self.weights,
+                                         self._step)
+                for span in spans]
+
+    def _prev_break(self, br: Break, all_ends: List[date]) -> int:
+        max_date = br.begin.date() - timedelta(days=self.min_gap)
         return bisect.bisect_left(all_ends, max_date)
 
     def _check_valid(self, new_path: List[Break]) -> bool:
@@ -296,19 +730,21 @@ class VacationExtender:
         still = self.n_breaks - len(new_path)
         for must_be_i in self.must_be:
             if must_be_i > br.end.date():
+                if still == 0:
+                    return False
                 break
             if all(must_be_i not in b for b in new_path):
                 return False
-        for i, start_i in enumerate(self.start_days):
+        for i, start_i in enumerate(self.start_anchors):
             if start_i > br.end.date():
-                if still < len(self.start_days) - i:
+                if still < len(self.start_anchors) - i:
                     return False
                 break
             if all(start_i != b.begin.date() for b in new_path):
                 return False
-        for i, end_i in enumerate(self.end_days):
+        for i, end_i in enumerate(self.end_anchors):
             if end_i > br.end.date():
-                if still < len(self.end_days) - i:
+                if still < len(self.end_anchors) - i:
                     return False
                 break
             if all(end_i != b.end.date() for b in new_path):
@@ -334,69 +770,354 @@ class VacationExtender:
                     return False
         return True
 
-    def _run_optimal(self):
+    def _has_path_constraints(self) -> bool:
+        return bool(self.must_be or self.start_anchors or self.end_anchors
+                    or self.months or self.start_months)
+
+    def _run_optimal(self, breaks: Sequence[Break],
+                     progress: Progress = None,
+                     cancel: CancelToken = None) -> List[List[Break]]:
         """ Runs the optimal vacation algorithm. """
-        all_ends: List[date] = [b.end.date() for b in self.breaks]
-        n = len(self.breaks)
-        dp: List[List[List[List[Tuple[int, List[Break]]]]]] = \
-            [[[[] for _ in range(self.n_breaks + 1)]
-              for _ in range(self.days + 1)]
-             for _ in range(n + 1)]
-        for i in range(n + 1):
-            for p in range(self.days + 1):
-                dp[i][0][0] = [(0, [])]
-        for i_idx, br in enumerate(self.breaks):
-            i = i_idx + 1
-            prev_idx = self._prev_break(i_idx, all_ends)
-
-            for p in range(self.days + 1):
-                for k in range(1, self.n_breaks + 1):
-                    candidates = []
-                    if dp[i - 1][p][k]:
-                        prev_solutions = dp[i - 1][p][k]
-                        for score, path in prev_solutions:
-                            if self._check_valid(path):
-                                candidates.append((score, path))
-                    if p >= br.days_pto:
-                        prev_solutions = dp[prev_idx][p - br.days_pto][k - 1]
-                        for score, path in prev_solutions:
-                            new_score = score + br.total
-                            new_path = path + [br]
-                            if self._check_valid(new_path):
-                                candidates.append((new_score, new_path))
-                    if candidates:
-                        candidates.sort(key=lambda x: x[0], reverse=True)
-                        dp[i][p][k] = candidates[:self.top_n]
-
-        final_solutions = dp[n][self.days][self.n_breaks]
-        self.selected_breaks = [sol[1] for sol in final_solutions]
-
-    def _run_greedy(self):
-        """ Runs the greedy vacation algorithm. """
-        days_left = self.days
-        curr: List[Break] = []
-        ch_tried: bool = False
-        while len(self.breaks) > 0 and days_left > 0:
-            br: Break = self.pq_pop()
-            if len(curr) > 0 and curr[-1].times_tried == br.times_tried - 1:
-                if ch_tried:
+        if self.workers > 1 and not self._has_path_constraints():
+            return self._run_optimal_split(breaks, progress, cancel)
+        all_ends: List[date] = [b.end.date() for b in breaks]
+        n = len(breaks)
+        constrained = self._has_path_constraints()
+        # dp[i] maps the reachable (PTO, periods, constraints satisfied)
+        # states of the first i breaks to their best (score, path)
+        # solutions. Paths are checked when created, and validity depends
+        # on the path only, so the states of row i - 1 carry over
+        # unchanged.
+        dp: List[Dict[tuple, List[Tuple[float, List[Break]]]]] = \
+            [{(0, 0, ()): [(0, [])]}]
+        # Best score of a complete plan so far: complete states carry over
+        # to later rows, so it only grows
+        best = None
+        reported = time.monotonic()
+        for br in breaks:
+            if cancel is not None:
+                cancel.check()
+            prev = dp[self._prev_break(br, all_ends)]
+            row = dict(dp[-1])
+            for (p, k, _), prev_solutions in prev.items():
+                if p + br.cost > self.budget or k == self.n_breaks:
+                    continue
+                for score, path in prev_solutions:
+                    new_path = path + [br]
+                    if not self._check_valid(new_path):
+                        continue
+                    state = (p + br.cost, k + 1,
+                             self._satisfied(new_path) if constrained else ())
+                    candidates = row.get(state, [])
+                    # Kept sorted by score, ties in insertion order
+                    i = len(candidates)
+                    while i > 0 and candidates[i - 1][0] < score + br.value:
+                        i -= 1
+                    if i < self.top_n:
+                        row[state] = (candidates[:i]
+                                      + [(score + br.value, new_path)]
+                                      + candidates[i:])[:self.top_n]
+                        if state[:2] == (self.budget, self.n_breaks) \
+                                and (best is None or score + br.value > best):
+                            best = score + br.value
+            dp.append(row)
+            if progress is not None and (
+                    len(dp) > n
+                    or time.monotonic() - reported >= PROGRESS_SECONDS):
+                reported = time.monotonic()
+                progress((len(dp) - 1) / n, best)
+
+        return [sol[1] for sol in self._final_solutions(dp[n])]
+
+    def _final_solutions(self, row: Dict[tuple, List]) -> List:
+        """ Best solutions of a DP row spending the budget in all periods. """
+        solutions = [sol for (p, k, _), sols in row.items()
+                     if p == self.budget and k == self.n_breaks
+                     for sol in sols]
+        solutions.sort(key=lambda x: x[0], reverse=True)
+        return solutions[:self.top_n]
+
+    def _satisfied(self, path: List[Break]) -> Tuple[int, ...]:
+        """
+        How many mandatory days, anchors and months a valid path meets.
+        A valid path meets a prefix of each sorted list, so two paths with
+        the same counts accept the same continuations: they compete for
+        the same top-N slots, unlike paths still owing a constraint.
+        """
+        return (sum(any(day in b for b in path) for day in self.must_be),
+                sum(any(day == b.begin.date() for b in path)
+                    for day in self.start_anchors),
+                sum(any(day == b.end.date() for b in path)
+                    for day in self.end_anchors),
+                sum(any(month == b.begin.date().month == b.end.date().month
+                        for b in path) for month in self.months),
+                sum(any(month == b.begin.date().month for b in path)
+                    for month in self.start_months))
+
+    def _day_dp_applies(self) -> bool:
+        """
+        The day-indexed DP handles the per-break PTO limits only: anchors,
+        mandatory days, months and total-days limits need candidates.
+        """
+        return not self._has_path_constraints() \
+            and self.min_tot_break <= max(self.min_vac_break, 1) \
+            and self.max_tot_break == 999999
+
+    def _run_day_dp(self, progress: Progress = None,
+                    cancel: CancelToken = None) -> List[List[Break]]:
+        """ Runs the day-indexed optimal algorithm (no candidate breaks). """
+        compact = self.calendar.compact()
+        limits = self.limits()
+        solutions = solve_days(compact, self.budget, self.n_breaks,
+                               self.top_n, self.min_gap,
+                               -(-limits.min_vac_break // self._step),
+                               limits.max_vac_break // self._step,
+                               self.holiday_as_pto, self.weights, progress,
+                               cancel, self._step)
+        return [[self.calendar.make_break(
+                     compact.span(begin, end, self.holiday_as_pto),
+                     self.alpha, self.weights, self._step)
+                 for begin, end in path] for _, path in solutions]
+
+    def _run_optimal_split(self, breaks: Sequence[Break],
+                           progress: Progress = None,
+                           cancel: CancelToken = None) -> List[List[Break]]:
+        """
+        Runs the optimal algorithm split in time across two processes.
+        Gives the same plans as _run_optimal when there are no anchors,
+        mandatory days or month constraints.
+        """
+        solutions = solve_split(self._items(breaks), self.budget,
+                                self.n_breaks, self.top_n, self.min_gap,
+                                self.workers, progress, cancel)
+        return [[breaks[i] for i in reversed(path)] for _, path in solutions]
+
+    @staticmethod
+    def _items(breaks: Sequence[Break]) -> List[Item]:
+        return [Item(i, br.begin.date().toordinal(),
+                     br.end.date().toordinal(), br.cost, br.value)
+                for i, br in enumerate(breaks)]
+
+    def _run_greedy(self, breaks: Sequence[Break],
+                    progress: Progress = None,
+                    cancel: CancelToken = None) -> List[List[Break]]:
+        """ Runs the greedy vacation algorithm, by weighted ROI. """
+        # value^(1 + alpha) / PTO, best first
+        def priority(br: Break) -> tuple:
+            return -br.w_roi, -br.value, br.cost
+
+        heap = IndexedHeap()
+        by_pto: Dict[int, IndexedHeap] = defaultdict(IndexedHeap)
+        for i, br in enumerate(breaks):
+            heap.push(i, priority(br))
+            by_pto[br.cost].push(i, priority(br))
+        index = SpanIndex([(br.begin.date(), br.end.date())
+                           for br in breaks])
+        window = timedelta(days=self.min_gap)
+
+        def remove(ids: List[int], removed: List[int]):
+            for j in ids:
+                if j in heap:
+                    heap.discard(j)
+                    by_pto[breaks[j].cost].discard(j)
+                    removed.append(j)
+
+        def restore(removed: List[int]):
+            for j in removed:
+                heap.push(j, priority(breaks[j]))
+                by_pto[breaks[j].cost].push(
+                    j, priority(breaks[j]))
+
+        days_left = self.budget
+        selected = IntervalSet()
+        plan: List[Tuple[int, List[int]]] = []
+        best: List[Break] = []
+        remove([j for p in list(by_pto) if p > days_left
+                for j in by_pto[p]], [])
+        max_cost = max((br.cost for br in breaks), default=0)
+        deadline = time.monotonic() + self.max_seconds
+        undos = 0
+        while days_left > 0:
+            if cancel is not None:
+                cancel.check()
+            if progress is not None:
+                progress(1 - len(heap) / max(len(breaks), 1),
+                         sum(breaks[i].value for i, _ in plan))
+            if len(plan) == self.n_breaks - 1:
+                # The last period must spend exactly the remaining budget
+                idx = by_pto[days_left].peek()
+            else:
+                idx = heap.peek()
+            if idx is None:
+                # Dead end: undo the latest selection, keeping the best
+                # plan, until GREEDY_MAX_UNDOS undos or max_seconds
+                curr = [breaks[i] for i, _ in plan]
+                if sum(br.value for br in curr) > \
+                        sum(br.value for br in best):
+                    best = curr
+                if not plan or undos == GREEDY_MAX_UNDOS \
+                        or time.monotonic() > deadline:
                     break
-                curr[-1].times_tried += 1
-                ch_tried = True
-                self.pq_add(curr[-1])
-                self.selected_breaks.append(curr.copy())
-                curr.pop()
-            elif len(curr) == self.n_breaks - 1 \
-                    and br.days_pto != days_left:
-                ch_tried = False
-                self.pq_add(br)
-            elif br.days_pto > days_left \
-                    or any(br ^ ci for ci in curr) \
-                    or any(br.gap(ci) < self.min_gap for ci in curr):
-                ch_tried = False
-                self.pq_add(br)
+                undos += 1
+                i, removed = plan.pop()
+                br = breaks[i]
+                selected.remove(br.begin.date(), br.end.date())
+                days_left += br.cost
+                restore(removed[1:])
+                # Banned until the selection before it is undone, so the
+                # same dead end is never retried under the same prefix
+                if plan:
+                    plan[-1][1].append(i)
+                continue
+            br = breaks[idx]
+            # Dropped lazily, under the selection that made it infeasible:
+            # conflicting with the plan, over the remaining budget, or too
+            # short for the periods left (each at most the longest
+            # candidate) to spend the rest
+            periods_after = self.n_breaks - len(plan) - 1
+            if not days_left - periods_after * max_cost <= br.cost \
+                    <= days_left or selected.conflicts(
+                        br.begin.date(), br.end.date(), self.min_gap):
+                remove([idx], plan[-1][1] if plan else [])
+                continue
+            # Selecting drops, in bulk, the candidates overlapping it or
+            # closer than min_gap
+            removed = []
+            remove([idx], removed)
+            remove(index.intersecting(br.begin.date() - window,
+                                      br.end.date() + window), removed)
+            selected.add(br.begin.date(), br.end.date())
+            plan.append((idx, removed))
+            days_left -= br.cost
+        if days_left == 0:
+            best = [breaks[i] for i, _ in plan]
+        return [list(sorted(best))] if best else []
+
+    def _run_lns(self, breaks: Sequence[Break],
+                 progress: Progress = None,
+                 cancel: CancelToken = None) -> List[List[Break]]:
+        """ Improves the greedy plan by large neighborhood search. """
+        plans = self._run_greedy(breaks, progress, cancel)
+        if not plans:
+            return plans
+        position = {id(br): i for i, br in enumerate(breaks)}
+        plan = [position[id(br)] for br in plans[0]]
+        index = self._get_window_index(breaks)
+        rng = random.Random(self.seed)
+        deadline = time.monotonic() + self.lns_seconds
+        first = self.calendar.first_date.date().toordinal()
+        last = self.calendar.last_date.date().toordinal()
+        # Window DP tables by (start, end, budget, periods): restarts
+        # revisit the same windows
+        tables: Dict[Tuple[int, int, int, int], dict] = dict()
+
+        def table(lo: int, hi: int, budget: int, periods: int) -> dict:
+            key = lo, hi, budget, periods
+            if key not in tables:
+                tables[key] = index.window_table(*key)
+            return tables[key]
+
+        def value(ids: List[int]) -> float:
+            return sum(breaks[j].value for j in ids)
+
+        def valid(ids: List[int]) -> bool:
+            return not self._has_path_constraints() \
+                or self._check_valid([breaks[i] for i in ids])
+
+        def window(ids: List[int], i: int, r: int) -> Tuple[int, int]:
+            lo = breaks[ids[i - 1]].end.date().toordinal() \
+                + self.min_gap + 1 if i > 0 else first
+            hi = breaks[ids[i + r]].begin.date().toordinal() \
+                - self.min_gap - 1 if i + r < len(ids) else last
+            return lo, hi
+
+        def refill(ids: List[int], freed: List[int]) -> Optional[List[int]]:
+            """ Best replacement of ids[freed] (positions, sorted). """
+            # The freed PTO is spent again, exactly, on the best breaks
+            # between the kept neighbours: the window DP gives every
+            # (PTO, periods) cell of each freed window, and two windows
+            # are joined over the freed PTO
+            budget = sum(breaks[ids[i]].cost for i in freed)
+            periods = len(freed) + self.n_breaks - len(ids)
+            runs = [[freed[0]]]
+            for i in freed[1:]:
+                if i == runs[-1][-1] + 1:
+                    runs[-1].append(i)
+                else:
+                    runs.append([i])
+            cells = [table(*window(ids, run[0], len(run)), budget, periods)
+                     for run in runs]
+            joined = cells[0].items() if len(cells) == 1 else (
+                ((p1 + p2, k1 + k2), (s1 + s2, path1 + path2))
+                for (p1, k1), (s1, path1) in cells[0].items()
+                for (p2, k2), (s2, path2) in cells[1].items())
+            best = None
+            for (p, k), (score, path) in joined:
+                if p == budget and 0 < k <= periods \
+                        and (best is None or score > best[0]):
+                    best = score, path
+            if best is None:
+                return None
+            kept = [j for i, j in enumerate(ids) if i not in freed]
+            return sorted(kept + list(best[1]))
+
+        def descend(ids: List[int]) -> List[int]:
+            """ Applies the best move until none improves the plan. """
+            # Like greedy, plans may miss mandatory days, anchors or
+            # months, but one meeting them is never traded for one that
+            # does not
+            while True:
+                moves = [[i] for i in range(len(ids))] \
+                    + [[i, j] for j in range(len(ids)) for i in range(j)]
+                # In an order drawn from ALGORITHM.seed
+                rng.shuffle(moves)
+                best_ids, best_rank = ids, (valid(ids), value(ids))
+                for freed in moves:
+                    if cancel is not None:
+                        cancel.check()
+                    if time.monotonic() >= deadline:
+                        return best_ids
+                    new_ids = refill(ids, freed)
+                    if new_ids is not None \
+                            and (valid(new_ids), value(new_ids)) > best_rank:
+                        best_ids = new_ids
+                        best_rank = valid(new_ids), value(new_ids)
+                if best_ids is ids:
+                    return ids
+                ids = best_ids
+
+        # At a local optimum, swap a random break for another of the same
+        # PTO in its window and descend again, keeping the best plan, until
+        # LNS_MAX_KICKS restarts in a row fail or lns_seconds have passed
+        best = plan = descend(plan)
+        kicks = 0
+        while kicks < LNS_MAX_KICKS and time.monotonic() < deadline:
+            kicks += 1
+            if progress is not None:
+                progress(1.0, value(best))
+            i = rng.randrange(len(plan))
+            swaps = [j for j in index.inside(*window(plan, i, 1))
+                     if j != plan[i]
+                     and breaks[j].cost == breaks[plan[i]].cost]
+            if not swaps:
+                continue
+            plan = descend(plan[:i] + [rng.choice(swaps)] + plan[i + 1:])
+            if (valid(plan), value(plan)) > (valid(best), value(best)):
+                best = plan
+                kicks = 0
             else:
-                ch_tried = False
-                curr.append(br)
-                days_left -= br.days_pto
-        self.selected_breaks.append(curr.copy())
+                plan = best
+        return [[breaks[i] for i in best]]
+
+
+def solve(config_data: dict, calendar: Calendar = None,
+          algorithm: str = None, progress: Progress = None,
+          cancel: CancelToken = None) -> Result:
+    """
+    Solves a configuration given as a dictionary; the other arguments are
+    as in VacationExtender.solve(). Being a module function, it can be
+    submitted to a process pool.
+    """
+    return VacationExtender(config_data=config_data,
+                            calendar=calendar).solve(algorithm, progress,
+                                                     cancel)
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import tempfile
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Prebuilt list of the countries and subdivisions supported by the
+# holidays library, so the CLI and the app need not import it to list them
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'data', 'countries.json')
+INDEX_FORMAT = 2
+
+
+def holidays_version() -> Optional[str]:
+    """ Installed version of the holidays library, read from its metadata. """
+    # The name of the dist-info directory is enough, and much cheaper to
+    # read than importing importlib.metadata
+    for entry in sys.path:
+        try:
+            names = os.listdir(entry or '.')
+        except OSError:
+            continue
+        for name in names:
+            if name.startswith('holidays-') and name.endswith('.dist-info'):
+                return name[len('holidays-'):-len('.dist-info')]
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+        return version('holidays')
+    except PackageNotFoundError:
+        return None
+
+
+def build_country_index(path: str = INDEX_PATH) -> Dict[str, List[str]]:
+    """ Scans the holidays library and writes the index to path. """
+    countries, aliases = _scan_library()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'format': INDEX_FORMAT,
+                   'holidays': holidays_version(),
+                   'countries': countries,
+                   'aliases': aliases}, f, indent=1, sort_keys=True)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return countries
+
+
+def _scan_library() -> Tuple[Dict[str, List[str]], List[str]]:
+    """ Every supported code, aliases included, and the alias codes. """
+    import holidays as hd
+    countries = {code: sorted(subdivisions) for code, subdivisions
+                 in sorted(hd.list_supported_countries().items())}
+    # Alpha-3 and other alias codes of a country it already lists
+    aliases = sorted(set(countries)
+                     - set(hd.list_supported_countries(include_aliases=False)))
+    return countries, aliases
+
+
+@lru_cache(maxsize=2)
+def supported_countries(include_aliases: bool = True) -> Dict[str, List[str]]:
+    """
+    Country codes mapped to their subdivision codes. Read from the
+    prebuilt index when it matches the installed holidays version, from
+    the library otherwise. Without include_aliases, each country appears
+    under its primary code only (BR, not BRA).
+    """
+    try:
+        with open(INDEX_PATH) as f:
+            index = json.load(f)
+        if index.get('format') == INDEX_FORMAT \
+                and index.get('holidays') == holidays_version():
+            countries, aliases = index['countries'], index['aliases']
+        else:
+            countries, aliases = _scan_library()
+    except (OSError, ValueError):
+        countries, aliases = _scan_library()
+    if include_aliases:
+        return countries
+    aliases = set(aliases)
+    return {code: subdivisions for code, subdivisions in countries.items()
+            if code not in aliases}
@@ -0,0 +1,147 @@
+import bisect
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .mycalendar import CompactCalendar, DayWeights, FORBIDDEN, HOLIDAY
+
+# A plan as a tuple of (begin, end) day indices, in date order
+DayPath = Tuple[Tuple[int, int], ...]
+DaySolution = Tuple[float, DayPath]
+
+
+class Token(NamedTuple):
+    """ A whole run of holidays, or a single working or forbidden day. """
+    kind: int
+    begin: int
+    end: int
+    value: float
+    # PTO in steps when charged (holidays: only with in_holiday_as_pto)
+    pto: int
+
+
+def tokenize(calendar: CompactCalendar,
+             weights: Optional[DayWeights] = None,
+             step: int = 1) -> List[Token]:
+    types = calendar.types
+    tokens: List[Token] = []
+    i = 0
+    while i < len(types):
+        end = i
+        if types[i] == HOLIDAY:
+            end = i + calendar.holidays_to_right[i] - 1
+            pto = (end - i + 1) * calendar.units_per_day // step
+        else:
+            pto = calendar.day_units(i) // step
+        value = end - i + 1 if weights is None else weights.value(i, end)
+        tokens.append(Token(types[i], i, end, value, pto))
+        i = end + 1
+    return tokens
+
+
+def _push(table: Dict, state, solutions: List, top_n: int):
+    if state in table:
+        solutions = table[state] + solutions
+        solutions.sort(key=lambda x: x[0], reverse=True)
+    table[state] = solutions[:top_n]
+
+
+def _flatten(path) -> DayPath:
+    """ Turns a (parent, (begin, end)) chain into a flat DayPath. """
+    spans = []
+    while path:
+        path, span = path
+        spans.append(span)
+    return tuple(reversed(spans))
+
+
+def solve_days(calendar: CompactCalendar, days: int, n_breaks: int,
+               top_n: int, min_gap: int, min_vac_break: int,
+               max_vac_break: int, holiday_as_pto: bool,
+               weights: Optional[DayWeights] = None,
+               progress: Optional[Callable] = None,
+               cancel=None, step: int = 1) -> List[DaySolution]:
+    """
+    Exact top-N plans spending exactly days PTO in exactly n_breaks
+    periods, by a DP over the calendar itself instead of candidate breaks.
+    days and the per-break limits are in steps of step PTO units of the
+    calendar, step dividing the units of every day.
+
+    The calendar is read as tokens (holiday runs, working and forbidden
+    days). A break is a run of tokens without forbidden days that starts
+    or ends on a holiday run and cannot be extended over an adjacent
+    holiday, as the candidate breaks of Calendar.new_break. Open breaks
+    are states (PTO used, periods, PTO of the open break, starts on a
+    holiday), the open break PTO being capped at min_vac_break when
+    max_vac_break does not bind. Closed plans are rows indexed by the day
+    their last break ends, so min_gap is a lookup rather than a state.
+
+    Scores of open breaks are kept relative to the value of the days
+    before their begin, so extending a break never touches its solutions:
+    the cost grows with tokens x states, whatever the number of breaks.
+    """
+    tokens = tokenize(calendar, weights, step)
+    # value_before[t]: value of the tokens before t
+    value_before = [0.0]
+    for tok in tokens:
+        value_before.append(value_before[-1] + tok.value)
+    min_q = max(min_vac_break, 1)
+    max_q = min(max_vac_break, days)
+    cap_q = max_q if max_q < days else min_q
+    # rows[j]: plans whose breaks all end on or before row_ends[j]
+    rows: List[Dict[Tuple[int, int], List]] = [{(0, 0): [(0, ())]}]
+    row_ends: List[int] = [-1]
+    # (PTO, periods, open break PTO, starts on holiday) -> solutions of
+    # (score - value before the open break, plan, open break begin)
+    opened: Dict[Tuple[int, int, int, bool], List] = dict()
+    for t, tok in enumerate(tokens):
+        if cancel is not None:
+            cancel.check()
+        prev_kind = tokens[t - 1].kind if t > 0 else None
+        next_kind = tokens[t + 1].kind if t + 1 < len(tokens) else None
+        if tok.kind == FORBIDDEN:
+            opened = dict()
+        elif tok.kind != HOLIDAY:
+            extended = dict()
+            for (p, k, q, starts), sols in opened.items():
+                # Holidays between two working days of a break
+                pto = tok.pto + (tokens[t - 1].pto
+                                 if holiday_as_pto and prev_kind == HOLIDAY
+                                 and q > 0 else 0)
+                if p + pto > days or q + pto > max_q:
+                    continue
+                _push(extended, (p + pto, k, min(q + pto, cap_q), starts),
+                      sols, top_n)
+            opened = extended
+        if tok.kind == HOLIDAY or (tok.kind != FORBIDDEN
+                                   and prev_kind != HOLIDAY):
+            # rows[0] holds only the empty plan, which any break may follow
+            before = rows[max(bisect.bisect_right(
+                row_ends, tok.begin - min_gap - 1) - 1, 0)]
+            pto = tok.pto if tok.kind != HOLIDAY else 0
+            offset = value_before[t]
+            for (p, k), sols in before.items():
+                if k == n_breaks or p + pto > days:
+                    continue
+                _push(opened, (p + pto, k + 1, pto, tok.kind == HOLIDAY),
+                      [(score - offset, path, tok.begin)
+                       for score, path in sols], top_n)
+        if tok.kind == HOLIDAY or (tok.kind != FORBIDDEN
+                                   and next_kind != HOLIDAY):
+            row = None
+            offset = value_before[t + 1]
+            for (p, k, q, starts), sols in opened.items():
+                if q < min_q or not (starts or tok.kind == HOLIDAY):
+                    continue
+                if row is None:
+                    row = dict(rows[-1])
+                _push(row, (p, k),
+                      [(score + offset, (path, (begin, tok.end)))
+                       for score, path, begin in sols], top_n)
+            if row is not None:
+                rows.append(row)
+                row_ends.append(tok.end)
+        if progress is not None:
+            best = rows[-1].get((days, n_breaks))
+            progress((t + 1) / len(tokens), best[0][0] if best else None)
+    return [(score, _flatten(path))
+            for score, path in rows[-1].get((days, n_breaks), [])]
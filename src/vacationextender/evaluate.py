@@ -0,0 +1,105 @@
+from array import array
+from datetime import date
+from itertools import accumulate
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, \
+    Tuple
+
+from .core import Result, VacationExtender
+from .mycalendar import FORBIDDEN
+
+
+class SpanEvaluation(NamedTuple):
+    """
+    One requested break measured like a candidate break: begin and end
+    are extended over adjacent holidays, as in Calendar.new_break.
+    """
+    begin: date
+    end: date
+    # PTO days, fractional with half days
+    pto: float
+    total: int
+    roi: float
+    value: float
+    # Days of forced_work inside the break
+    forced_work: int
+    # More than min_gap_days after the previous break of the plan
+    gap_ok: bool
+    # Inside the calendar of the configuration
+    inside: bool
+
+
+class PlanEvaluation(NamedTuple):
+    """ A requested plan (the breaks of one person) and its totals. """
+    spans: List[SpanEvaluation]
+    pto: float
+    total: int
+    value: float
+    over_budget: bool
+    too_many_periods: bool
+    valid: bool
+    # Value of the plan over the value of the optimal plan
+    optimal_ratio: Optional[float]
+
+
+def evaluate_plans(ve: VacationExtender,
+                   plans: Dict[Hashable, Sequence[Tuple[date, date]]],
+                   optimal: Optional[Result] = None) \
+        -> Dict[Hashable, PlanEvaluation]:
+    """
+    Scores requested plans with the rules of the configuration of ve: PTO
+    (with in_holiday_as_pto), total days off, ROI and weighted value of
+    every break, forced_work days inside and min_gap_days between breaks,
+    and the budget and number of periods of every plan. Plans are compared
+    with the best plan of optimal, when given.
+
+    Every break is measured in O(1) on the prefix arrays of the compact
+    calendar, so a batch costs one pass over the calendar plus constant
+    work per break, whatever the length of the breaks.
+    """
+    compact = ve.calendar.compact()
+    n = len(compact)
+    first = compact.first_ordinal
+    # forced_before[i]: forced work days in days [0, i)
+    forced_before = array('i', accumulate(
+        (t == FORBIDDEN for t in compact.types), initial=0))
+    best = None
+    if optimal is not None and optimal.plans:
+        best = sum(br.value for br in optimal.plans[0])
+    evaluations = dict()
+    for person, plan in plans.items():
+        spans = []
+        # PTO of the plan in units of the calendar, summed exactly
+        units = 0
+        prev_end = None
+        for begin, end in sorted(plan):
+            b, e = begin.toordinal() - first, end.toordinal() - first
+            if not 0 <= b <= e < n:
+                spans.append(SpanEvaluation(begin, end, 0, 0, 0.0, 0.0, 0,
+                                            True, False))
+                continue
+            span = compact.span(b, e, ve.holiday_as_pto)
+            if span is None:
+                # Only holidays: nothing to spend
+                pto, total = 0, e - b + 1
+            else:
+                b, e, _, _, span_units, _ = span
+                pto, total = compact.pto_days(span_units), e - b + 1
+                units += span_units
+            value = total if ve.weights is None else ve.weights.value(b, e)
+            gap_ok = prev_end is None or b - prev_end > ve.min_gap
+            prev_end = e if prev_end is None else max(prev_end, e)
+            spans.append(SpanEvaluation(
+                compact.date(b), compact.date(e), pto, total,
+                total / pto if pto else 0.0, value,
+                forced_before[e + 1] - forced_before[b], gap_ok, True))
+        pto = compact.pto_days(units)
+        total = sum(s.total for s in spans)
+        value = sum(s.value for s in spans)
+        over_budget = pto > ve.days
+        too_many_periods = len(spans) > ve.n_breaks
+        valid = not (over_budget or too_many_periods) and all(
+            s.inside and s.gap_ok and s.forced_work == 0 for s in spans)
+        evaluations[person] = PlanEvaluation(
+            spans, pto, total, value, over_budget, too_many_periods, valid,
+            value / best if best else None)
+    return evaluations
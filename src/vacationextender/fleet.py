@@ -0,0 +1,124 @@
+import copy
+
+from datetime import date, timedelta
+from typing import Dict, Hashable, List, NamedTuple, Sequence, Tuple
+
+from .core import Result, VacationExtender
+from .mycalendar import Break, Calendar
+
+dDAY = timedelta(days=1)
+
+
+class CalendarDelta(NamedTuple):
+    """
+    Holidays added to or removed from the calendar of every config. A
+    moved holiday is one removal plus one addition.
+    """
+    added: Tuple[date, ...] = ()
+    removed: Tuple[date, ...] = ()
+
+
+class ReplanReport(NamedTuple):
+    """ Outcome of replan(), keyed like its input. """
+    configs: Dict[Hashable, dict]
+    results: Dict[Hashable, Result]
+    resolved: List[Hashable]
+    changed: List[Hashable]
+
+
+def apply_delta(ve: VacationExtender, delta: CalendarDelta) -> dict:
+    """
+    Returns a copy of the config of ve with the delta applied: removed
+    custom holidays are dropped, other removed dates (library holidays)
+    go to removed_holidays, and added dates go to custom_holidays.
+    """
+    config = copy.deepcopy(ve.config)
+    custom = set(ve.custom_holidays)
+    removed = set(delta.removed)
+    holidays = (custom - removed) | set(delta.added)
+    revoked = (ve.removed_holidays | (removed - custom)) - set(delta.added)
+    constraints = config.setdefault('CONSTRAINTS', dict())
+    constraints['custom_holidays'] = \
+        [day.isoformat() for day in sorted(holidays)]
+    constraints['removed_holidays'] = \
+        [day.isoformat() for day in sorted(revoked)]
+    return config
+
+
+def affected_zones(old: Calendar, new: Calendar,
+                   delta: CalendarDelta) -> List[Tuple[date, date]]:
+    """
+    Date intervals whose breaks may have changed: the run of holidays
+    around each changed date, in either calendar, plus one day on each
+    side, since breaks are extended over adjacent holidays.
+    """
+    zones = []
+    for day in sorted(set(delta.added) | set(delta.removed)):
+        lo = hi = day
+        for calendar in (old, new):
+            begin = end = day
+            while begin - dDAY in calendar \
+                    and calendar[begin - dDAY].is_holiday():
+                begin -= dDAY
+            while end + dDAY in calendar \
+                    and calendar[end + dDAY].is_holiday():
+                end += dDAY
+            lo, hi = min(lo, begin), max(hi, end)
+        zones.append((lo - dDAY, hi + dDAY))
+    return zones
+
+
+def touches(plan: Sequence[Break], zones: List[Tuple[date, date]]) -> bool:
+    return any(br.begin <= hi and br.end >= lo
+               for br in plan for lo, hi in zones)
+
+
+def gains_holidays(old: Calendar, new: Calendar,
+                   delta: CalendarDelta) -> bool:
+    """ True if an added holiday is a new day off in the horizon. """
+    return any(day in new and new[day].type != old[day].type
+               for day in delta.added)
+
+
+def _spans(result: Result) -> List[List[Tuple[date, date]]]:
+    return [[(br.begin.date(), br.end.date()) for br in plan]
+            for plan in result.plans]
+
+
+def replan(fleet: Dict[Hashable, Tuple[dict, Result]], delta: CalendarDelta,
+           full: bool = False) -> ReplanReport:
+    """
+    Applies a calendar delta to stored (config, result) pairs and solves
+    again the configs whose calendar gains a holiday, whose plans have a
+    break touching an affected zone, or that had no plan (all of them
+    when full). Additions are never incremental: a new holiday can make a
+    better plan anywhere, so every config whose horizon gains one is
+    solved in full. A removed one only makes the breaks around it worse,
+    so a plan away from every removed holiday is kept: it is worth the
+    same and nothing got better. changed lists the configs whose plans
+    differ.
+    """
+    report = ReplanReport(dict(), dict(), list(), list())
+    zones: Dict[Tuple[Calendar, Calendar], List[Tuple[date, date]]] = dict()
+    for key, (config, result) in fleet.items():
+        old = VacationExtender(config_data=config)
+        new_config = apply_delta(old, delta)
+        report.configs[key] = new_config
+        new = VacationExtender(config_data=new_config)
+        # Calendars come from the shared cache: one zone list per pair
+        calendars = old.calendar, new.calendar
+        if calendars not in zones:
+            zones[calendars] = affected_zones(old.calendar, new.calendar,
+                                              delta)
+        if not full and result.plans \
+                and not gains_holidays(old.calendar, new.calendar, delta) \
+                and not any(touches(plan, zones[calendars])
+                            for plan in result.plans):
+            report.results[key] = result
+            continue
+        new_result = new.solve()
+        report.results[key] = new_result
+        report.resolved.append(key)
+        if _spans(new_result) != _spans(result):
+            report.changed.append(key)
+    return report
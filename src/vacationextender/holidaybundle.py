@@ -0,0 +1,150 @@
+import bisect
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from array import array
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Path of the bundle Calendar reads holidays from before falling back to
+# the holidays library
+BUNDLE_ENV = 'VACATIONEXT_HOLIDAY_BUNDLE'
+
+# Header: magic, format version, byte order (1 little, 2 big), number of
+# locations, first and last year, holidays version that built it. Then one
+# directory entry per location (country, subdivision, offset and count of
+# its days) and the sorted native int32 day ordinals of all locations.
+BUNDLE_MAGIC = b'VXHB'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<4sHHIHH16s')
+BUNDLE_ENTRY = struct.Struct('<4s24sII')
+_BYTE_ORDER = 1 if sys.byteorder == 'little' else 2
+
+Location = Tuple[str, Optional[str]]
+
+
+class HolidayBundle:
+    """
+    Holidays of many locations memory-mapped from a bundle file.
+
+    The directory is read once when the bundle is opened; a lookup is a
+    dict access plus two bisections in the location's sorted ordinals.
+    Opening a bundle built by another holidays version than the installed
+    one prints a warning: its holidays may be outdated.
+    """
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byte_order, count, first_year, last_year, \
+            holidays_version = BUNDLE_HEADER.unpack_from(self._map)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION \
+                or byte_order != _BYTE_ORDER:
+            self._map.close()
+            raise ValueError(f"Unsupported holiday bundle: {path}")
+        self.first_year: int = first_year
+        self.last_year: int = last_year
+        self.holidays_version: str = \
+            holidays_version.rstrip(b'\0').decode()
+        from .countries import holidays_version as installed_version
+        installed = installed_version()
+        if installed is not None and self.holidays_version != installed:
+            print(f"⚠️ WARNING: Holiday bundle '{path}' was built with "
+                  f"holidays {self.holidays_version or '(unknown)'}, but "
+                  f"holidays {installed} is installed. Rebuild it with "
+                  f"'vacationext build-holidays'.")
+        self._locations: Dict[Location, Tuple[int, int]] = dict()
+        for i in range(count):
+            country, subdivision, offset, n = BUNDLE_ENTRY.unpack_from(
+                self._map, BUNDLE_HEADER.size + i * BUNDLE_ENTRY.size)
+            subdivision = subdivision.rstrip(b'\0').decode()
+            self._locations[(country.rstrip(b'\0').decode(),
+                             subdivision or None)] = (offset, n)
+        start = BUNDLE_HEADER.size + count * BUNDLE_ENTRY.size
+        self._ordinals = memoryview(self._map)[start:].cast('i')
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, location: Location):
+        return location in self._locations
+
+    def locations(self) -> List[Location]:
+        return list(self._locations)
+
+    def lookup(self, country: str, subdivision: Optional[str],
+               years: Set[int]) -> Optional[List[date]]:
+        """
+        Sorted holidays of the location in years, or None when the bundle
+        does not hold the location or all the years.
+        """
+        found = self._locations.get((country, subdivision or None))
+        if found is None or not years or min(years) < self.first_year \
+                or max(years) > self.last_year:
+            return None
+        offset, n = found
+        ordinals = self._ordinals[offset:offset + n]
+        lo = bisect.bisect_left(ordinals, date(min(years), 1, 1).toordinal())
+        hi = bisect.bisect_right(ordinals,
+                                 date(max(years), 12, 31).toordinal())
+        return [day for day in map(date.fromordinal, ordinals[lo:hi])
+                if day.year in years]
+
+    def close(self):
+        self._ordinals.release()
+        self._map.close()
+
+
+def build_bundle(path: str, locations: Iterable[Location], first_year: int,
+                 last_year: int) -> int:
+    """
+    Computes the holidays of every location from first_year to last_year
+    with the holidays library and writes them atomically to path. Returns
+    the number of locations written.
+    """
+    import holidays as hd
+    from .countries import holidays_version
+    entries = []
+    ordinals = array('i')
+    for country, subdivision in sorted(set(locations),
+                                       key=lambda x: (x[0], x[1] or '')):
+        if len(country) > 4 or len(subdivision or '') > 24:
+            raise ValueError(
+                f"Location code too long for a bundle: {country}/{subdivision}")
+        days = sorted(hd.country_holidays(
+            country=country, subdiv=subdivision,
+            years=range(first_year, last_year + 1), observed=True).keys())
+        entries.append(BUNDLE_ENTRY.pack(country.encode(),
+                                         (subdivision or '').encode(),
+                                         len(ordinals), len(days)))
+        ordinals.extend(day.toordinal() for day in days)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(BUNDLE_HEADER.pack(
+                BUNDLE_MAGIC, BUNDLE_VERSION, _BYTE_ORDER, len(entries),
+                first_year, last_year, (holidays_version() or '').encode()))
+            f.write(b''.join(entries))
+            f.write(ordinals.tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(entries)
+
+
+@lru_cache(maxsize=4)
+def open_bundle(path: str) -> HolidayBundle:
+    """ The bundle at path, opened once per process. """
+    return HolidayBundle(path)
+
+
+def default_bundle() -> Optional[HolidayBundle]:
+    """ The bundle named by the VACATIONEXT_HOLIDAY_BUNDLE variable. """
+    path = os.environ.get(BUNDLE_ENV)
+    return open_bundle(path) if path else None
@@ -1,8 +1,8 @@
 import argparse
 import sys
 import os
+from datetime import date
 from pathlib import Path
-from .core import VacationExtender
 
 # --- Default Configuration Template ---
 # This string ensures that users installing via pip can generate 
@@ -34,6 +34,11 @@ include_observed = false
 # Total vacation days available in the budget
 vacation_days = 30
 
+# Smallest fraction of a day PTO is counted in: 1 (whole days) or 0.5
+# (half days). vacation_days and the limits per break may then be
+# fractional, e.g. vacation_days = 12.5
+pto_unit = 1
+
 # Maximum number of distinct vacation periods allowed
 max_vac_periods = 3
 
@@ -53,10 +58,19 @@ top_n_suggestions = 1
 #   - Interval:   "YYYY-MM-DD:YYYY-MM-DD" (Start:End)
 custom_holidays = []
 
+# Public holidays that are working days (e.g. moved or revoked by decree).
+# Same format as custom_holidays.
+removed_holidays = []
+
 # Mandatory work days or intervals (dates where you CANNOT take vacation).
 # Same format as custom_holidays.
 forced_work = []
 
+# Working days that cost half a day of PTO (e.g. a site working only the
+# morning before a holiday). Needs pto_unit = 0.5.
+# Same format as custom_holidays.
+half_days = []
+
 # List of specific dates where you are already committed to being on vacation.
 # The engine will prioritize these dates and calculate extensions around them.
 # Same format as custom_holidays.
@@ -77,12 +91,55 @@ must_end_on = []
 required_months = []
 
 [ALGORITHM]
-# 'optimal' (Slow, Perfect) or 'greedy' (Fast, Heuristic)
-algorithm_type = "optimal"
+# 'optimal' (Slow, Perfect), 'greedy' (Fast, Heuristic), 'lns' (greedy
+# improved by local re-optimization), 'day_dp' (Perfect, scans the calendar
+# day by day; best for long horizons or long breaks; falls back to
+# 'optimal' with anchors, mandatory days, months or total-days limits),
+# 'portfolio' (races 'portfolio_engines' in parallel processes and keeps
+# the first exact answer, or the best one after 'max_seconds') or
+# 'auto' (picks the cheaper of 'optimal' and 'day_dp' when it is expected
+# to finish within 'max_seconds' and 'accuracy' is "exact", 'lns' when it
+# is not, and 'greedy' for "heuristic")
+algorithm_type = "auto"
+
+# Used by 'auto': "exact" or "heuristic"
+accuracy = "exact"
+
+# Used by 'auto': latency target of the optimal search, in seconds
+max_seconds = 10
+
+# Used by 'lns': time limit of the improvement pass, in seconds, and the
+# seed of its random move order
+lns_seconds = 1.0
+seed = 0
+
+# Used by 'portfolio': engines raced against each other. Extra 'workers'
+# beyond this list run 'lns' with other seeds.
+portfolio_engines = ["optimal", "day_dp", "greedy", "lns"]
 
 # Alpha Factor (0.0 to 1.0). 
 # Higher values prefer longer consecutive breaks over total days off.
 duration_weight_factor_alpha = 0.5
+
+# Worker processes used to generate candidate breaks and, when there are
+# no anchors, mandatory days or month constraints, to split the 'optimal'
+# search in two halves. Default: 1 (serial)
+# Worth raising only for multi-year horizons on multi-core machines.
+workers = 1
+
+[ROSTER]
+# Rotating shift roster replacing 'weekend' as rest days: one character per
+# day of the cycle, "1" = day off, "0" = working, starting on 'anchor'.
+# Examples: "11110000" (4 off / 4 on), "11001110011000" (2-2-3 rotation).
+# Leave 'pattern' empty to use the weekend.
+pattern = ""
+anchor = "2026-01-01"
+
+[WEIGHTS]
+# Value of a day off (default 1.0), for single days or intervals in the
+# same formats as custom_holidays. Plans maximize the total value.
+# "2026-07-01:2026-07-31" = 1.5    # school holidays
+# "2026-12-24:2026-12-31" = 2.0    # peak season
 """
 
 
@@ -112,6 +169,69 @@ def parse_args():
         "init", help="Create a template config.toml file"
     )
 
+    # Command 'countries'
+    countries_parser = subparsers.add_parser(
+        "countries", help="List supported countries and subdivisions"
+    )
+    countries_parser.add_argument(
+        "country", nargs="?", help="Only list this country's subdivisions"
+    )
+    countries_parser.add_argument(
+        "--rebuild-index", action="store_true",
+        help="Regenerate the prebuilt country index from 'holidays'"
+    )
+
+    # Command 'build-holidays'
+    bundle_parser = subparsers.add_parser(
+        "build-holidays",
+        help="Precompute holidays into a bundle read without 'holidays'"
+    )
+    bundle_parser.add_argument(
+        "locations", nargs="+",
+        help="Locations as COUNTRY (national holidays), COUNTRY:SUBDIV "
+             "or COUNTRY:* (national and every subdivision)"
+    )
+    bundle_parser.add_argument(
+        "-o", "--output", default="holidays.vxh",
+        help="Bundle file to write (default: holidays.vxh)"
+    )
+    bundle_parser.add_argument(
+        "--first-year", type=int, default=date.today().year,
+        help="First year of the bundle (default: current year)"
+    )
+    bundle_parser.add_argument(
+        "--last-year", type=int, default=date.today().year + 1,
+        help="Last year of the bundle (default: next year)"
+    )
+
+    # Command 'atlas'
+    atlas_parser = subparsers.add_parser(
+        "atlas",
+        help="Solve the config for many countries, subdivisions and years"
+    )
+    atlas_parser.add_argument(
+        "--years", type=int, nargs="+",
+        default=[date.today().year + i for i in range(1, 4)],
+        help="Years to solve (default: the next three)"
+    )
+    atlas_parser.add_argument(
+        "--countries", nargs="+",
+        help="Country codes to solve, with all their subdivisions "
+             "(default: every supported country)"
+    )
+    atlas_parser.add_argument(
+        "-o", "--output", default="atlas.jsonl",
+        help="Output file, CSV if it ends with .csv (default: atlas.jsonl)"
+    )
+    atlas_parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes (default: one per CPU)"
+    )
+    atlas_parser.add_argument(
+        "--restart", action="store_true",
+        help="Overwrite the output instead of resuming it"
+    )
+
     args = parser.parse_args()
 
     if args.command == "init":
@@ -123,6 +243,19 @@ def parse_args():
         print("✅ Created default 'config.toml'. Edit it and run 'vacationext'.")
         sys.exit(0)
 
+    if args.command == "countries":
+        list_countries(args.country, args.rebuild_index)
+        sys.exit(0)
+
+    if args.command == "build-holidays":
+        build_holidays(args.output, args.locations,
+                       args.first_year, args.last_year)
+        sys.exit(0)
+
+    if args.command == "atlas":
+        atlas(args)
+        sys.exit(0)
+
     config_path = args.config
 
     if not os.path.exists(config_path):
@@ -132,8 +265,68 @@ def parse_args():
     return args
 
 
+def list_countries(country=None, rebuild=False):
+    from .countries import build_country_index, supported_countries
+    countries = build_country_index() if rebuild else supported_countries()
+    if country is None:
+        for code, subdivisions in countries.items():
+            print(f"{code}: {', '.join(subdivisions) or '-'}")
+    elif country in countries:
+        print('\n'.join(countries[country]) or '-')
+    else:
+        print(f"❌ Unknown country code '{country}'.")
+        sys.exit(1)
+
+
+def build_holidays(output, locations, first_year, last_year):
+    from .countries import supported_countries
+    from .holidaybundle import BUNDLE_ENV, build_bundle
+    countries = supported_countries()
+    expanded = list()
+    for location in locations:
+        country, _, subdivision = location.partition(':')
+        if country not in countries:
+            print(f"❌ Unknown country code '{country}'.")
+            sys.exit(1)
+        if subdivision == '*':
+            expanded.append((country, None))
+            expanded.extend((country, s) for s in countries[country])
+        elif subdivision and subdivision not in countries[country]:
+            print(f"❌ Unknown subdivision '{subdivision}' of '{country}'.")
+            sys.exit(1)
+        else:
+            expanded.append((country, subdivision or None))
+    if first_year > last_year:
+        print("❌ --first-year is after --last-year.")
+        sys.exit(1)
+    n = build_bundle(output, expanded, first_year, last_year)
+    print(f"✅ Wrote {n} locations ({first_year}-{last_year}) to '{output}'.")
+    print(f"Set {BUNDLE_ENV}={output} to use it.")
+
+
+def atlas(args):
+    from .atlas import atlas_keys, sweep
+    from .core import VacationExtender
+    config = VacationExtender._load_config(args.config) \
+        if os.path.exists(args.config) else dict()
+    keys = atlas_keys(args.years, args.countries)
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end="", flush=True)
+
+    report = sweep(config, args.output, keys, args.workers,
+                   resume=not args.restart, progress=progress)
+    print(f"\n✅ Solved {len(report.written)}, skipped "
+          f"{len(report.skipped)} already in '{args.output}', "
+          f"failed {len(report.failed)}.")
+
+
 def main():
-    ve = VacationExtender(parse_args().config)
+    # The other commands exit inside parse_args, before core is imported,
+    # so that 'init', 'countries' and 'build-holidays' start instantly
+    args = parse_args()
+    from .core import VacationExtender
+    ve = VacationExtender(args.config)
     ve.run()
     print(ve)
 
@@ -1,6 +1,13 @@
-import holidays as hd
+import hashlib
+import json
+import threading
+from array import array
+from collections import OrderedDict
 from datetime import date, timedelta
-from typing import List, Set, Union, Dict, Optional
+from itertools import accumulate
+from typing import List, Set, Union, Dict, FrozenSet, Optional, Tuple
+
+from .holidaybundle import default_bundle
 
 FORBIDDEN, HOLIDAY, WORKING = range(3)
 TYPES = {0: 'forbidden',
@@ -9,6 +16,15 @@ TYPES = {0: 'forbidden',
 dDAY = timedelta(days=1)
 
 
+def units_per_day(pto_unit: float) -> int:
+    """ PTO units in a day: 1 for whole days, 2 for half days, ... """
+    units = round(1 / pto_unit) if pto_unit > 0 else 0
+    if units < 1 or abs(units * pto_unit - 1) > 1e-9:
+        raise ValueError(f"Invalid pto_unit {pto_unit}: expected a "
+                         f"fraction of a day such as 1, 0.5 or 0.25")
+    return units
+
+
 class CalendarDay:
     def __init__(self, day: date):
         self.day: date = day
@@ -67,58 +83,179 @@ class CalendarDay:
         return self.day.strftime(format)
 
 
+class Roster:
+    """
+    Periodic rest days of a shift worker: pattern[i] is '1' when the i-th
+    day of the cycle starting on anchor is off, e.g. '11110000' for four
+    days off and four on.
+    """
+    def __init__(self, pattern: str, anchor: date):
+        if not pattern or set(pattern) - {'0', '1'}:
+            raise ValueError(f"Invalid roster pattern '{pattern}': "
+                             f"expected a string of 0s and 1s")
+        self.pattern: str = pattern
+        self.anchor: date = anchor
+        # Bit i set when day i of the cycle is off
+        self.mask: int = int(pattern[::-1], 2)
+
+    def __len__(self):
+        return len(self.pattern)
+
+    def __eq__(self, other):
+        return isinstance(other, Roster) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self) -> Tuple[str, str]:
+        return self.pattern, self.anchor.isoformat()
+
+    def is_off(self, day: date) -> bool:
+        return bool(self.mask >> ((day - self.anchor).days % len(self)) & 1)
+
+    def off_days(self, first: date, n: int) -> bytes:
+        """ One byte per day from first on, 1 on rest days. """
+        offset = (first - self.anchor).days % len(self)
+        cycle = bytes(int(c) for c in self.pattern)
+        repeats = -(-(offset + n) // len(self))
+        return (cycle * repeats)[offset:offset + n]
+
+
 class Calendar:
+    """
+    Day types of a location over a date range.
+
+    Rest days are the weekdays in weekend or, for shift workers, the off
+    days of a Roster. with_roster() derives the calendar of another roster
+    without reloading the holidays.
+
+    Library holidays on removed_holidays are working days (a holiday
+    moved or revoked by decree); custom_holidays are added after them.
+
+    PTO is counted in units of pto_unit days. Half days are working days
+    that cost half a day of PTO (e.g. a site working mornings only);
+    with_pto_unit() derives the calendar of other units or half days.
+
+    A Calendar is read-only once built (assigning attributes raises
+    AttributeError), so one instance can be shared by many
+    VacationExtender objects and threads; see CalendarCache.
+    """
     def __init__(self, country: str = 'BR', subdivision: str = None,
                  first_date: Union[date, CalendarDay] = None,
                  last_date: Union[date, CalendarDay] = None,
                  weekend: List[int] = None,
                  custom_holidays: List[Union[date, CalendarDay]] = None,
-                 forbidden: Set[Union[date, CalendarDay]] = None):
+                 forbidden: Set[Union[date, CalendarDay]] = None,
+                 roster: Roster = None, half_days: Set[date] = None,
+                 pto_unit: float = 1, removed_holidays: Set[date] = None):
         self.country: str = country
         self.state: str = subdivision
         if first_date is None:
             first_date = date(date.today().year, 1, 1)
         if last_date is None:
             last_date = date(date.today().year, 12, 31)
+        if custom_holidays is None:
+            custom_holidays = list()
+        if forbidden is None:
+            forbidden = set()
         self.first_date = CalendarDay(first_date)
         self.last_date = CalendarDay(last_date)
-        self.weekends: List[int] = [5, 6] if weekend is None else weekend
-        self.dates: Dict[date, CalendarDay] = dict()
-        self.years: Set[int] = set()
-        curr = self.first_date.date()
-        while curr <= self.last_date.date():
-            self.dates[curr] = CalendarDay(curr)
-            self.years.add(curr.year)
-            curr += dDAY
+        self.weekends: Tuple[int, ...] = \
+            (5, 6) if weekend is None else tuple(weekend)
+        self.roster: Optional[Roster] = roster
+        self.half_days: FrozenSet[date] = frozenset(half_days or ())
+        self.pto_unit: float = pto_unit
+        self.years: Set[int] = set(
+            range(self.first_date.date().year, self.last_date.date().year + 1))
         self._load_holidays()
+        if removed_holidays:
+            self._holidays = [day for day in self._holidays
+                              if day not in removed_holidays]
         self._holidays.extend(custom_holidays)
-        self._forbidden = forbidden
-        for curr in self.dates:
-            if curr in forbidden:
-                self.dates[curr].set_forbidden()
-            elif self.is_weekend(curr):
-                self.dates[curr].set_holiday()
-                self._holidays.append(curr)
-            elif self.is_holiday(curr):
-                self.dates[curr].set_holiday()
-        self._holidays.sort()
+        self._holiday_set = frozenset(self._holidays)
+        self._forbidden = frozenset(forbidden)
+        self._set_types()
+        self._frozen = True
+
+    def _set_types(self):
+        """
+        Types every day in one pass over the horizon; rest days are added
+        to the holidays.
+        """
+        units = units_per_day(self.pto_unit)
+        if self.half_days and units % 2:
+            raise ValueError(f"half_days need a pto_unit of half a day or "
+                             f"less, not {self.pto_unit}")
+        first = self.first_date.date()
+        n = max((self.last_date.date() - first).days + 1, 0)
+        rest_days = self._rest_days(first, n)
+        holidays = list(self._holiday_set)
+        types = bytearray(n)
+        halves = bytearray(n if self.half_days else 0)
+        self.dates: Dict[date, CalendarDay] = dict()
+        for i in range(n):
+            curr = first + timedelta(days=i)
+            day = CalendarDay(curr)
+            if curr in self._forbidden:
+                day.set_forbidden()
+            elif rest_days[i]:
+                day.set_holiday()
+                holidays.append(curr)
+            elif curr in self._holiday_set:
+                day.set_holiday()
+            types[i] = day.type
+            if day.type == WORKING and curr in self.half_days:
+                halves[i] = 1
+            self.dates[curr] = day
+        self._holidays = tuple(sorted(holidays))
+        self._compact = CompactCalendar(first.toordinal(), bytes(types),
+                                        bytes(halves), units)
+
+    def _rest_days(self, first: date, n: int) -> bytes:
+        if self.roster is not None:
+            return self.roster.off_days(first, n)
+        week = bytes(int(d in self.weekends) for d in range(7))
+        return (week * (n // 7 + 2))[first.weekday():first.weekday() + n]
+
+    def with_roster(self, roster: Optional[Roster]) -> 'Calendar':
+        """
+        Returns this calendar with the rest days of roster (or of the
+        weekend when None), sharing the loaded holidays.
+        """
+        return self._derive(roster=roster)
+
+    def with_pto_unit(self, pto_unit: float,
+                      half_days: Set[date] = None) -> 'Calendar':
+        """
+        Returns this calendar counting PTO in units of pto_unit days, with
+        half_days costing half a day, sharing the loaded holidays.
+        """
+        return self._derive(pto_unit=pto_unit,
+                            half_days=frozenset(half_days or ()))
+
+    def _derive(self, **changes) -> 'Calendar':
+        calendar = object.__new__(Calendar)
+        for name in ('country', 'state', 'first_date', 'last_date',
+                     'weekends', 'years', '_holiday_set', '_forbidden',
+                     'roster', 'half_days', 'pto_unit'):
+            setattr(calendar, name, changes.get(name, getattr(self, name)))
+        calendar._set_types()
+        calendar._frozen = True
+        return calendar
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"Calendar is read-only (setting '{name}')")
+        super().__setattr__(name, value)
 
     def __str__(self):
         return '\n'.join(str(day) for day in self)
 
     def __iter__(self):
-        self._iter_current_date = self.first_date.date()
-        return self
-
-    def __next__(self) -> CalendarDay:
-        if self._iter_current_date > self.last_date.date():
-            raise StopIteration
-        current_day: CalendarDay = self.dates.get(self._iter_current_date)
-
-        if current_day is None:
-            raise ValueError(f"Day {self._iter_current_date} ausente no calendário.")
-        self._iter_current_date += timedelta(days=1)
-        return current_day
+        curr = self.first_date.date()
+        while curr <= self.last_date.date():
+            yield self.dates[curr]
+            curr += dDAY
 
     def __getitem__(self, item: Union[int, date]) -> CalendarDay:
         if isinstance(item, int):
@@ -130,8 +267,18 @@ class Calendar:
 
     def _load_holidays(self):
         """
-        Loads all holidays in the specified year and location.
+        Loads all holidays in the specified year and location, from the
+        holiday bundle when one is set and holds them.
         """
+        bundle = default_bundle()
+        if bundle is not None:
+            found = bundle.lookup(self.country, self.state, self.years)
+            if found is not None:
+                self._holidays = found
+                return
+        # Imported here: the library is large and only needed to build
+        # calendars, not to start the CLI or to read a cached calendar
+        import holidays as hd
         try:
             self._holidays = list(sorted(hd.country_holidays(
                 country=self.country,
@@ -150,40 +297,265 @@ class Calendar:
         return self._holidays
 
     def is_weekend(self, day: date) -> bool:
-        return self.dates[day].date().weekday() in self.weekends
+        if self.roster is not None:
+            return self.roster.is_off(day)
+        return day.weekday() in self.weekends
 
     def is_holiday(self, day: date) -> bool:
-        return self.dates[day].date() in self.holidays()
+        return self.dates[day].date() in self._holiday_set
 
     def is_working(self, day: date) -> bool:
         return not (self.is_weekend(day) or self.is_holiday(day))
 
+    def compact(self) -> 'CompactCalendar':
+        """ Returns the read-only, one byte per day view of the calendar. """
+        return self._compact
+
+    def day_weights(self, weights: Dict[date, float]) -> 'DayWeights':
+        """ Values the days of the calendar (1.0 unless listed in weights). """
+        return DayWeights(self.compact(), weights)
+
+    def make_break(self, span: Tuple[int, int, int, int, int, int],
+                   alpha: float, weights: 'DayWeights' = None,
+                   step: int = 1) -> 'Break':
+        """
+        Builds a Break from a span produced by CompactCalendar.span. Its
+        value is the weighted sum of its days when weights are given, and
+        its cost is its PTO in steps of step units.
+        """
+        compact = self.compact()
+        begin, end, begin_pto, end_pto, n_pto, n_holiday = span
+        br = Break(compact.date(begin), compact.date(end), alpha)
+        br.set_pto_range(compact.date(begin_pto), compact.date(end_pto))
+        br.set_days(compact.pto_days(n_pto), n_holiday, n_pto, n_pto // step)
+        if weights is not None:
+            br.set_value(weights.value(begin, end))
+        return br
+
     def new_break(self, begin: date, end: date,
                   in_holiday_as_pto: bool, alpha: float):
-        while begin - dDAY in self and self[begin - dDAY].is_holiday():
-            begin -= dDAY
-        while end + dDAY in self and self[end + dDAY].is_holiday():
-            end += dDAY
-        br = Break(begin, end, alpha)
-        n_total = (end - begin).days + 1
-        n_holiday = 0
-        while begin in self and self[begin].is_holiday() and begin <= end:
-            n_holiday += 1
-            begin += dDAY
-        while end in self and self[end].is_holiday() and end >= begin:
-            n_holiday += 1
-            end -= dDAY
-        br.set_pto_range(begin, end)
-        if not in_holiday_as_pto:
-            while begin <= end:
-                if self[begin].is_holiday():
-                    n_holiday += 1
-                begin += dDAY
+        compact = self.compact()
+        span = compact.span(compact.index(begin), compact.index(end),
+                            in_holiday_as_pto)
+        if span is None:
+            return
+        return self.make_break(span, alpha)
+
+
+class CompactCalendar:
+    """
+    Read-only view of a Calendar as one type byte per day, plus the run
+    lengths and prefix sums needed to measure any span in O(1).
+
+    PTO is measured in units of 1 / units_per_day days; halves, when not
+    empty, flags the working days costing half a day.
+
+    It holds only bytes and integer arrays, so it pickles cheaply and can
+    be shared with worker processes.
+    """
+    def __init__(self, first_ordinal: int, types: bytes,
+                 halves: bytes = b'', units_per_day: int = 1):
+        self.first_ordinal: int = first_ordinal
+        self.types: bytes = bytes(types)
+        self.halves: bytes = bytes(halves) if any(halves) else b''
+        self.units_per_day: int = units_per_day
+        # Largest unit count dividing the PTO of every day
+        self.pto_step: int = units_per_day // 2 if self.halves \
+            else units_per_day
+        n = len(self.types)
+        # halves_before[i]: half days in days [0, i)
+        self.halves_before = array('i', accumulate(self.halves, initial=0))
+        # holidays_before[i]: holidays in days [0, i)
+        self.holidays_before = array('i', [0] * (n + 1))
+        # holidays_to_left[i]: consecutive holidays ending at day i
+        self.holidays_to_left = array('i', [0] * n)
+        # holidays_to_right[i]: consecutive holidays starting at day i
+        self.holidays_to_right = array('i', [0] * n)
+        for i, t in enumerate(self.types):
+            is_holiday = t == HOLIDAY
+            self.holidays_before[i + 1] = self.holidays_before[i] + is_holiday
+            if is_holiday:
+                self.holidays_to_left[i] = \
+                    1 + (self.holidays_to_left[i - 1] if i > 0 else 0)
+        for i in range(n - 1, -1, -1):
+            if self.types[i] == HOLIDAY:
+                self.holidays_to_right[i] = \
+                    1 + (self.holidays_to_right[i + 1] if i < n - 1 else 0)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getstate__(self):
+        return self.first_ordinal, self.types, self.halves, self.units_per_day
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def index(self, day: date) -> int:
+        return day.toordinal() - self.first_ordinal
+
+    def date(self, i: int) -> date:
+        return date.fromordinal(self.first_ordinal + i)
+
+    def day_units(self, i: int) -> int:
+        """ PTO units of day i when charged. """
+        if self.halves and self.halves[i]:
+            return self.units_per_day // 2
+        return self.units_per_day
+
+    def pto_days(self, units: int) -> Union[int, float]:
+        """ units of PTO in days, an int when whole. """
+        days, rest = divmod(units, self.units_per_day)
+        return days if rest == 0 else units / self.units_per_day
+
+    def span(self, begin: int, end: int, in_holiday_as_pto: bool) \
+            -> Optional[Tuple[int, int, int, int, int, int]]:
+        """
+        Measures the break [begin, end] (day indices) the way
+        Calendar.new_break does: the span is extended over adjacent
+        holidays and the holidays at both edges are never charged as PTO.
+
+        Returns (begin, end, begin_pto, end_pto, n_pto, n_holiday), or None
+        when the span would not use any PTO. n_pto is in PTO units, which
+        are days unless the calendar has a pto_unit below one day.
+        """
+        if begin > 0:
+            begin -= self.holidays_to_left[begin - 1]
+        if end < len(self.types) - 1:
+            end += self.holidays_to_right[end + 1]
+        n_total = end - begin + 1
+        leading = min(self.holidays_to_right[begin], n_total)
+        begin_pto = begin + leading
+        trailing = min(self.holidays_to_left[end], end - begin_pto + 1) \
+            if end >= begin_pto else 0
+        end_pto = end - trailing
+        n_holiday = leading + trailing
+        if not in_holiday_as_pto and begin_pto <= end_pto:
+            n_holiday += self.holidays_before[end_pto + 1] \
+                - self.holidays_before[begin_pto]
         n_pto = n_total - n_holiday
         if n_pto == 0:
             return
-        br.set_days(n_pto, n_holiday)
-        return br
+        n_pto *= self.units_per_day
+        if self.halves:
+            # Half days are working days, so always charged
+            n_pto -= (self.halves_before[end_pto + 1]
+                      - self.halves_before[begin_pto]) \
+                * (self.units_per_day // 2)
+        return begin, end, begin_pto, end_pto, n_pto, n_holiday
+
+
+class DayWeights:
+    """
+    Value of every day of a CompactCalendar as a prefix-sum array, so the
+    value of any span is an O(1) range query.
+    """
+    def __init__(self, calendar: CompactCalendar, weights: Dict[date, float]):
+        n = len(calendar)
+        # value_before[i]: value of days [0, i)
+        self.value_before = array('d', [0.0] * (n + 1))
+        for i in range(n):
+            weight = weights.get(calendar.date(i), 1.0)
+            if weight < 0:
+                raise ValueError(f"Negative weight {weight} on "
+                                 f"{calendar.date(i)}")
+            self.value_before[i + 1] = self.value_before[i] + weight
+
+    def value(self, begin: int, end: int) -> float:
+        """ Value of the days [begin, end] (day indices). """
+        # Rounded so equal-valued spans tie exactly despite float sums
+        return round(self.value_before[end + 1] - self.value_before[begin], 9)
+
+
+class CalendarCache:
+    """
+    Bounded LRU of calendars keyed by a canonical hash of their inputs.
+
+    Calendars are read-only, so the same instance is handed out to every
+    caller asking for the same location, dates, weekend, custom and
+    removed holidays, forced work days, roster and PTO unit. Calendars of a roster or of a
+    PTO unit are derived from the cached calendar without them, so the
+    holidays are loaded once per location whatever their number.
+    """
+    def __init__(self, maxsize: int = 64):
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._calendars: 'OrderedDict[str, Calendar]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calendars)
+
+    @staticmethod
+    def key(country: str, subdivision: Optional[str],
+            first_date: date, last_date: date, weekend: List[int],
+            custom_holidays: List[date], forbidden: Set[date],
+            roster: Roster = None, half_days: Set[date] = None,
+            pto_unit: float = 1, removed_holidays: Set[date] = None) -> str:
+        canonical = json.dumps([
+            country, subdivision,
+            first_date.isoformat(), last_date.isoformat(),
+            sorted(set(weekend)),
+            sorted({d.isoformat() for d in custom_holidays}),
+            sorted({d.isoformat() for d in forbidden}),
+            None if roster is None else roster.key(),
+            sorted({d.isoformat() for d in half_days or ()}),
+            pto_unit,
+            sorted({d.isoformat() for d in removed_holidays or ()})
+        ])
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, country: str, subdivision: Optional[str],
+            first_date: date, last_date: date, weekend: List[int],
+            custom_holidays: List[date], forbidden: Set[date],
+            roster: Roster = None, half_days: Set[date] = None,
+            pto_unit: float = 1,
+            removed_holidays: Set[date] = None) -> Calendar:
+        key = self.key(country, subdivision, first_date, last_date, weekend,
+                       custom_holidays, forbidden, roster, half_days,
+                       pto_unit, removed_holidays)
+        with self._lock:
+            calendar = self._calendars.get(key)
+            if calendar is not None:
+                self.hits += 1
+                self._calendars.move_to_end(key)
+                return calendar
+            self.misses += 1
+        if roster is not None:
+            calendar = self.get(country, subdivision, first_date, last_date,
+                                weekend, custom_holidays, forbidden, None,
+                                half_days, pto_unit,
+                                removed_holidays).with_roster(roster)
+        elif half_days or pto_unit != 1:
+            calendar = self.get(country, subdivision, first_date, last_date,
+                                weekend, custom_holidays, forbidden,
+                                removed_holidays=removed_holidays) \
+                .with_pto_unit(pto_unit, half_days)
+        else:
+            calendar = Calendar(country, subdivision, first_date, last_date,
+                                list(weekend), list(custom_holidays),
+                                set(forbidden),
+                                removed_holidays=set(removed_holidays or ()))
+        with self._lock:
+            self._calendars[key] = calendar
+            self._calendars.move_to_end(key)
+            while len(self._calendars) > self.maxsize:
+                self._calendars.popitem(last=False)
+        return calendar
+
+    def clear(self):
+        with self._lock:
+            self._calendars.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._calendars), 'maxsize': self.maxsize}
+
+
+# Calendars shared by all VacationExtender instances of the process
+CALENDAR_CACHE = CalendarCache()
 
 
 class Break:
@@ -192,12 +564,15 @@ class Break:
         self.end = CalendarDay(end)
         self.begin_pto = None
         self.end_pto = None
-        self.days_pto: Optional[int] = None
+        self.days_pto: Optional[Union[int, float]] = None
+        # PTO in units of the calendar, and in steps of the solving engine
+        self.pto_units: Optional[int] = None
+        self.cost: Optional[int] = None
         self.days_holidays: Optional[int] = None
         self.total: Optional[int] = None
+        self.value: Optional[float] = None
         self.roi: Optional[int] = None
         self.w_roi: Optional[int] = None
-        self.times_tried: int = -1
         self.alpha = alpha
 
     def __eq__(self, other):
@@ -224,9 +599,18 @@ class Break:
     def set_pto_range(self, begin: date, end: date):
         self.begin_pto, self.end_pto = CalendarDay(begin), CalendarDay(end)
 
-    def set_days(self, pto: int, holidays: int):
+    def set_days(self, pto: Union[int, float], holidays: int,
+                 units: int = None, cost: int = None):
+        """ PTO days (possibly fractional), and in units and steps. """
         self.days_pto = pto
+        self.pto_units = pto if units is None else units
+        self.cost = self.pto_units if cost is None else cost
         self.days_holidays = holidays
-        self.total = self.days_pto + self.days_holidays
+        self.total = (self.end.date() - self.begin.date()).days + 1
         self.roi = self.total / self.days_pto
-        self.w_roi = self.total ** (1 + self.alpha) / self.days_pto
+        self.set_value(self.total)
+
+    def set_value(self, value: float):
+        """ Sets the weighted value of the break (total days by default). """
+        self.value = value
+        self.w_roi = self.value ** (1 + self.alpha) / self.days_pto
@@ -0,0 +1,166 @@
+import multiprocessing
+import queue
+import time
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .candidates import Span
+from .core import CancelToken, Cancelled, Progress, Result, VacationExtender
+from .mycalendar import Break
+
+# Engines whose answer is proven optimal: the first one ends the race
+EXACT_ENGINES = ('optimal', 'day_dp')
+# Seconds between checks of cancel and of the deadline
+POLL_SECONDS = 0.05
+
+
+def _span(ve: VacationExtender, br: Break) -> Span:
+    compact = ve.calendar.compact()
+    return (compact.index(br.begin.date()), compact.index(br.end.date()),
+            compact.index(br.begin_pto.date()),
+            compact.index(br.end_pto.date()), br.pto_units, br.days_holidays)
+
+
+def plan_value(plans: List[List[Break]]) -> Optional[float]:
+    return sum(br.value for br in plans[0]) if plans else None
+
+
+def _race(name: str, engine: str, config: dict, calendar, spans: List[Span],
+          seed: int, results):
+    """
+    Runs one engine in a worker process and sends back its result, or the
+    error that stopped it.
+    """
+    config = dict(config, ALGORITHM=dict(config.get('ALGORITHM', dict()),
+                                         seed=seed, workers=1))
+    ve = VacationExtender(config_data=config, calendar=calendar)
+    ve.prepare(spans)
+    start = time.time()
+    error = None
+    try:
+        result = ve.solve(algorithm=engine)
+    except Exception as exc:
+        # Finished without a plan; the others keep racing
+        result, error = None, f"{type(exc).__name__}: {exc}"
+    results.put((name, time.time() - start, result, error))
+
+
+def members(ve: VacationExtender,
+            engines: Sequence[str]) -> List[Tuple[str, str, int]]:
+    """
+    (name, engine, seed) of every worker: one per engine, day_dp only when
+    it applies, and more 'lns' with other seeds up to ve.workers.
+    """
+    chosen = [(engine, engine, ve.seed) for engine in engines
+              if engine != 'day_dp' or ve._day_dp_applies()]
+    for i in range(1, ve.workers - len(chosen) + 1):
+        chosen.append((f'lns#{i}', 'lns', ve.seed + i))
+    return chosen
+
+
+def race(ve: VacationExtender, breaks: Sequence[Break],
+         cost_estimate: Dict[str, float], progress: Progress = None,
+         cancel: CancelToken = None) -> Result:
+    """
+    Races engines in worker processes on the prepared candidates of ve.
+
+    The race ends when an exact engine finishes, when every engine has
+    finished, or at the deadline (max_seconds), whichever comes first;
+    the best plan found wins. The deadline is hard: the workers still
+    running are terminated, and if none had returned a plan by then the
+    result is empty and infeasible says so. progress reports the elapsed
+    fraction of max_seconds and the best value of the finished engines.
+    The result is named after the winning engine, and race holds the
+    seconds, best value and error of every engine (None for the
+    unfinished ones). If no engine returned a result, infeasible lists
+    their errors.
+    """
+    spans = [_span(ve, br) for br in breaks]
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    workers = []
+    for name, engine, seed in members(ve, ve.portfolio):
+        process = context.Process(
+            target=_race, daemon=True,
+            args=(name, engine, ve.config, ve.calendar, spans, seed,
+                  results))
+        process.start()
+        workers.append((name, process))
+    finished: Dict[str, Tuple[float, Optional[Result], Optional[str]]] = \
+        dict()
+    best = None
+    timed_out = False
+    start = time.time()
+    try:
+        while len(finished) < len(workers):
+            if cancel is not None:
+                cancel.check()
+            elapsed = time.time() - start
+            if elapsed > ve.max_seconds:
+                timed_out = True
+                break
+            try:
+                name, seconds, result, error = results.get(
+                    timeout=min(POLL_SECONDS, ve.max_seconds - elapsed))
+            except queue.Empty:
+                if not any(process.is_alive() for _, process in workers):
+                    # Every worker exited: what they sent is already here
+                    try:
+                        while True:
+                            name, seconds, result, error = \
+                                results.get_nowait()
+                            finished[name] = seconds, result, error
+                    except queue.Empty:
+                        break
+                if progress is not None:
+                    progress(min(elapsed / ve.max_seconds, 1.0), best)
+                continue
+            finished[name] = seconds, result, error
+            value = None if result is None else plan_value(result.plans)
+            if value is not None and (best is None or value > best):
+                best = value
+            if result is not None and result.engine in EXACT_ENGINES:
+                break
+    except Cancelled:
+        return Result([], 'portfolio', cost_estimate, [], ve.days,
+                      ve._top_n, cancelled=True)
+    finally:
+        for _, process in workers:
+            if process.is_alive():
+                process.terminate()
+        for _, process in workers:
+            process.join()
+    race_stats = dict()
+    for name, _ in workers:
+        seconds, result, error = finished.get(name, (None, None, None))
+        race_stats[name] = \
+            seconds, None if result is None else plan_value(result.plans), \
+            error
+    # Exact engines first, then the best plan, then the engine order
+    order = {name: i for i, (name, _) in enumerate(workers)}
+    candidates = [name for name, (_, result, _) in finished.items()
+                  if result is not None]
+    if not candidates and timed_out:
+        return Result([], 'portfolio', cost_estimate,
+                      [f'no engine of the portfolio finished within '
+                       f'max_seconds ({ve.max_seconds:g} s)']
+                      + [f"{name}: {error}"
+                         for name, (_, _, error) in race_stats.items()
+                         if error is not None], ve.days,
+                      ve._top_n, race=race_stats)
+    if not candidates:
+        return Result([], 'portfolio', cost_estimate,
+                      ['every engine of the portfolio failed']
+                      + [f"{name}: {error}"
+                         for name, (_, _, error) in race_stats.items()
+                         if error is not None], ve.days,
+                      ve._top_n, race=race_stats)
+    winner = max(candidates, key=lambda name: (
+        finished[name][1].engine in EXACT_ENGINES,
+        race_stats[name][1] is not None,
+        race_stats[name][1] or 0,
+        -order[name]))
+    result = finished[winner][1]
+    result.cost_estimate = cost_estimate
+    result.race = race_stats
+    return result
@@ -0,0 +1,104 @@
+import copy
+import itertools
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from .candidates import Span, generate_candidates, loosest, measure, \
+    restrict
+from .core import Result, VacationExtender
+
+# "SECTION.key" -> value, e.g. {"ALGORITHM.duration_weight_factor_alpha": 1.0}
+Overrides = Dict[str, Any]
+
+
+class Scenario(NamedTuple):
+    """ One variant of a base config and its result. """
+    overrides: Overrides
+    config: dict
+    result: Result
+
+
+def scenario_grid(grid: Dict[str, Sequence[Any]]) -> List[Overrides]:
+    """
+    Every combination of the values in grid, keyed like Overrides:
+    {"CONSTRAINTS.in_holiday_as_pto": [False, True], ...}.
+    """
+    names = list(grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(grid[name] for name in names))]
+
+
+def with_overrides(base_config: dict, overrides: Overrides) -> dict:
+    """ Copy of base_config with the overrides applied. """
+    config = copy.deepcopy(base_config)
+    for name, value in overrides.items():
+        section, _, key = name.rpartition('.')
+        if not section:
+            raise ValueError(f"Override '{name}' is not 'SECTION.key'")
+        config.setdefault(section, dict())[key] = value
+    return config
+
+
+def _solve_variant(args) -> Result:
+    config, calendar, spans = args
+    ve = VacationExtender(config_data=config, calendar=calendar)
+    if spans is not None:
+        ve.prepare(spans)
+    return ve.solve()
+
+
+def solve_scenarios(base_config: dict, variants: Sequence[Overrides],
+                    workers: int = 1) -> List[Scenario]:
+    """
+    Solves every variant of base_config, sharing the preprocessing.
+
+    Variants with the same calendar and anchors (the cached calendar is
+    shared whenever location, dates, holidays and roster match) scan the
+    calendar once, under the loosest of their break limits; each variant
+    then keeps the spans its own limits allow, measured with its own
+    in_holiday_as_pto, and scores them with its own alpha and weights. The
+    candidates are the same as a separate prepare() would build.
+
+    With workers > 1 the variants are solved in a process pool, each
+    worker receiving the calendar and the spans of its variant.
+    """
+    configs = [with_overrides(base_config, overrides)
+               for overrides in variants]
+    extenders = [VacationExtender(config_data=config) for config in configs]
+    groups: Dict[tuple, List[int]] = dict()
+    for i, ve in enumerate(extenders):
+        key = ve.calendar, tuple(ve.start_anchors), tuple(ve.end_anchors)
+        groups.setdefault(key, list()).append(i)
+    spans: List[Optional[List[Span]]] = [None] * len(extenders)
+    for group in groups.values():
+        if len(group) == 1:
+            continue
+        first = extenders[group[0]]
+        compact = first.calendar.compact()
+        seeds = first.seeds()
+        scanned = generate_candidates(
+            compact, seeds,
+            loosest([extenders[i].limits() for i in group]),
+            max(extenders[i].workers for i in group))
+        measured = {holiday_as_pto: measure(compact, scanned, holiday_as_pto)
+                    for holiday_as_pto
+                    in {extenders[i].holiday_as_pto for i in group}}
+        for i in group:
+            ve = extenders[i]
+            spans[i] = restrict(measured[ve.holiday_as_pto], ve.limits())
+    if workers <= 1 or len(extenders) < 2:
+        for ve, variant_spans in zip(extenders, spans):
+            if variant_spans is not None:
+                ve.prepare(variant_spans)
+        results = [ve.solve() for ve in extenders]
+    else:
+        # Pool workers cannot start pools of their own
+        tasks = [(with_overrides(config, {'ALGORITHM.workers': 1}),
+                  ve.calendar, variant_spans)
+                 for config, ve, variant_spans
+                 in zip(configs, extenders, spans)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_solve_variant, tasks))
+    return [Scenario(dict(overrides), config, result)
+            for overrides, config, result in zip(variants, configs, results)]
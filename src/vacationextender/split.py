@@ -0,0 +1,187 @@
+import bisect
+import heapq
+
+from multiprocessing import Pool
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, \
+    Set, Tuple
+
+# Paths are tuples of candidate indices in *decreasing* order: the order in
+# which the serial DP breaks ties (latest break first) is then plain tuple
+# order, and every table below can be ranked with the same key.
+Path = Tuple[int, ...]
+Solution = Tuple[float, Path]
+Table = Dict[Tuple[int, int], List[Solution]]
+
+
+class Item(NamedTuple):
+    """ A candidate break reduced to what the DP needs. """
+    index: int
+    begin: int
+    end: int
+    pto: int
+    score: float
+
+
+def rank(solution: Solution) -> Tuple[float, Path]:
+    return -solution[0], solution[1]
+
+
+def top(solutions: Iterable[Solution], top_n: int) -> List[Solution]:
+    return heapq.nsmallest(top_n, solutions, key=rank)
+
+
+def _merge(old: List[Solution], new: List[Solution],
+           top_n: int) -> List[Solution]:
+    return list(islice(heapq.merge(old, new, key=rank), top_n))
+
+
+def forward_tables(items: List[Item], days: int, n_breaks: int,
+                   top_n: int, min_gap: int, keep: Set[int]) \
+        -> Dict[int, Table]:
+    """
+    Runs the DP over items sorted by end and returns the tables of the
+    prefixes listed in keep (a prefix j holds the first j items).
+    """
+    ends = [it.end for it in items]
+    rows: List[Table] = [{(0, 0): [(0, ())]}]
+    for it in items:
+        prev = rows[bisect.bisect_left(ends, it.begin - min_gap)]
+        row = dict(rows[-1])
+        for (p, k), sols in prev.items():
+            if p + it.pto > days or k + 1 > n_breaks:
+                continue
+            new = [(score + it.score, (it.index,) + path)
+                   for score, path in sols]
+            cell = (p + it.pto, k + 1)
+            row[cell] = _merge(row[cell], new, top_n) \
+                if cell in row else new
+        rows.append(row)
+    return {j: rows[j] for j in keep}
+
+
+def backward_tables(items: List[Item], days: int, n_breaks: int,
+                    top_n: int, min_gap: int, keep: Set[int]) \
+        -> Dict[int, Table]:
+    """
+    Mirror of forward_tables over items sorted by begin: returns the
+    tables of the suffixes listed in keep (a suffix j holds items[j:]).
+    """
+    begins = [it.begin for it in items]
+    rows: List[Table] = [dict() for _ in items] + [{(0, 0): [(0, ())]}]
+    for j in range(len(items) - 1, -1, -1):
+        it = items[j]
+        nxt = rows[bisect.bisect_right(begins, it.end + min_gap)]
+        row = dict(rows[j + 1])
+        for (p, k), sols in nxt.items():
+            if p + it.pto > days or k + 1 > n_breaks:
+                continue
+            new = [(score + it.score, path + (it.index,))
+                   for score, path in sols]
+            cell = (p + it.pto, k + 1)
+            row[cell] = _merge(row[cell], new, top_n) \
+                if cell in row else new
+        rows[j] = row
+    return {j: rows[j] for j in keep}
+
+
+def _choose_cut(items: List[Item], min_gap: int) -> int:
+    """
+    Picks a cut day in the middle half of the horizon that is crossed by
+    the fewest candidates.
+    """
+    begins = sorted(it.begin for it in items)
+    ends = sorted(it.end for it in items)
+    first, last = begins[0], ends[-1]
+    quarter = (last - first) // 4
+    best_cut, best_cross = first, len(items) + 1
+    for cut in range(first + quarter, last - quarter + 1):
+        n_left = bisect.bisect_left(ends, cut - min_gap)
+        n_right = len(begins) - bisect.bisect_right(begins, cut)
+        cross = len(items) - n_left - n_right
+        if cross < best_cross:
+            best_cut, best_cross = cut, cross
+    return best_cut
+
+
+def _pairs(left: Table, right: Table, days: int, n_breaks: int,
+           extra: Solution, top_n: int) -> List[Solution]:
+    found = []
+    extra_pto, extra_k, (extra_score, extra_path) = \
+        extra[0], extra[1], extra[2]
+    for (p, k), l_sols in left.items():
+        r_sols = right.get((days - extra_pto - p, n_breaks - extra_k - k))
+        if not r_sols:
+            continue
+        found.extend(top(((ls + extra_score + rs, rp + extra_path + lp)
+                          for ls, lp in l_sols for rs, rp in r_sols),
+                         top_n))
+    return found
+
+
+def solve_split(items: List[Item], days: int, n_breaks: int, top_n: int,
+                min_gap: int, workers: int = 2,
+                progress: Optional[Callable] = None,
+                cancel=None) -> List[Solution]:
+    """
+    Exact top-N plans spending exactly days PTO in exactly n_breaks
+    periods, computed by splitting the horizon at one cut day.
+
+    Every plan has at most one break crossing the window [cut - min_gap,
+    cut]. Plans without such a break join any left plan (items ending
+    before the window) with any right plan (items beginning after the
+    cut); plans with a crossing break x join the left prefix ending
+    before x with the right suffix beginning after x. The left prefixes
+    and right suffixes are computed in two worker processes and joined
+    with a max-plus product over (PTO, periods).
+
+    items must be sorted by (end, begin) with index equal to position.
+    progress and cancel (a core.CancelToken) are served by the calling
+    process while it waits for the halves and during the join.
+    """
+    cut = _choose_cut(items, min_gap)
+    left = [it for it in items if it.end < cut - min_gap]
+    right = sorted((it for it in items if it.begin > cut),
+                   key=lambda it: (it.begin, it.index))
+    crossing = [it for it in items
+                if it.end >= cut - min_gap and it.begin <= cut]
+    left_ends = [it.end for it in left]
+    right_begins = [it.begin for it in right]
+    left_keep = {len(left)} | {
+        bisect.bisect_left(left_ends, x.begin - min_gap) for x in crossing}
+    right_keep = {0} | {
+        bisect.bisect_right(right_begins, x.end + min_gap) for x in crossing}
+    args = (days, n_breaks, top_n, min_gap)
+    if workers > 1:
+        # Leaving the block terminates the workers, also on cancellation
+        with Pool(2) as pool:
+            r_left = pool.apply_async(forward_tables,
+                                      (left, *args, left_keep))
+            r_right = pool.apply_async(backward_tables,
+                                       (right, *args, right_keep))
+            for r in (r_left, r_right):
+                while not r.ready():
+                    r.wait(0.1)
+                    if cancel is not None:
+                        cancel.check()
+            left_tables, right_tables = r_left.get(), r_right.get()
+    else:
+        left_tables = forward_tables(left, *args, left_keep)
+        right_tables = backward_tables(right, *args, right_keep)
+
+    if progress is not None:
+        progress(0.5, None)
+    found = _pairs(left_tables[len(left)], right_tables[0],
+                   days, n_breaks, (0, 0, (0, ())), top_n)
+    for j, x in enumerate(crossing):
+        if cancel is not None:
+            cancel.check()
+        if progress is not None:
+            progress(0.5 + 0.5 * j / len(crossing),
+                     max((sol[0] for sol in found), default=None))
+        found.extend(_pairs(
+            left_tables[bisect.bisect_left(left_ends, x.begin - min_gap)],
+            right_tables[bisect.bisect_right(right_begins, x.end + min_gap)],
+            days, n_breaks, (x.pto, 1, (x.score, (x.index,))), top_n
+        ))
+    return top(found, top_n)
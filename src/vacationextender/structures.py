@@ -0,0 +1,118 @@
+import heapq
+import bisect
+
+from datetime import date, timedelta
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class IndexedHeap:
+    """
+    Min-priority queue over hashable keys with lazy invalidation.
+
+    Each key lives at most once in the queue. Re-pushing a key (or
+    discarding it) only bumps its version, and stale heap entries are
+    skipped when they reach the top, so both operations are O(log n).
+    """
+    def __init__(self):
+        self._heap: List[Tuple[tuple, int, Hashable]] = list()
+        self._live: Dict[Hashable, int] = dict()
+        self._version: int = 0
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._live
+
+    def __iter__(self):
+        return iter(list(self._live))
+
+    def push(self, key: Hashable, priority: tuple):
+        self._version += 1
+        self._live[key] = self._version
+        heapq.heappush(self._heap, (priority, self._version, key))
+
+    def discard(self, key: Hashable):
+        self._live.pop(key, None)
+
+    def _skip_stale(self):
+        while self._heap:
+            _, version, key = self._heap[0]
+            if self._live.get(key) == version:
+                return
+            heapq.heappop(self._heap)
+
+    def peek(self) -> Optional[Hashable]:
+        self._skip_stale()
+        return self._heap[0][-1] if self._heap else None
+
+    def pop(self) -> Optional[Hashable]:
+        self._skip_stale()
+        if not self._heap:
+            return None
+        key = heapq.heappop(self._heap)[-1]
+        del self._live[key]
+        return key
+
+
+class IntervalSet:
+    """
+    Disjoint closed date intervals kept sorted by their begin.
+
+    Since selected breaks never overlap, the intervals nearest to a query
+    (found by bisection) are the only ones that can conflict with it.
+    """
+    def __init__(self):
+        self._begins: List[date] = list()
+        self._ends: List[date] = list()
+
+    def __len__(self):
+        return len(self._begins)
+
+    def add(self, begin: date, end: date):
+        i = bisect.bisect_left(self._begins, begin)
+        self._begins.insert(i, begin)
+        self._ends.insert(i, end)
+
+    def remove(self, begin: date, end: date):
+        i = bisect.bisect_left(self._begins, begin)
+        if i < len(self._begins) and self._ends[i] == end:
+            del self._begins[i]
+            del self._ends[i]
+
+    def conflicts(self, begin: date, end: date, min_gap: int = 0) -> bool:
+        """
+        True if [begin, end] overlaps a stored interval or lies min_gap
+        days or less away from one (breaks need a gap over min_gap).
+        """
+        i = bisect.bisect_left(self._begins, begin)
+        if i < len(self._begins):
+            gap = (self._begins[i] - end).days
+            if gap <= max(min_gap, 0):
+                return True
+        if i > 0:
+            gap = (begin - self._ends[i - 1]).days
+            if gap <= max(min_gap, 0):
+                return True
+        return False
+
+
+class SpanIndex:
+    """
+    Static index of closed date intervals answering "which intervals
+    intersect [lo, hi]" in O(log n + answer) time.
+    """
+    def __init__(self, spans: List[Tuple[date, date]]):
+        order = sorted(range(len(spans)), key=lambda i: spans[i][0])
+        self._ids: List[int] = order
+        self._begins: List[date] = [spans[i][0] for i in order]
+        self._ends: List[date] = [spans[i][1] for i in order]
+        self._max_len = max(((e - b).days for b, e in spans), default=0)
+
+    def intersecting(self, lo: date, hi: date) -> List[int]:
+        first = bisect.bisect_left(
+            self._begins, lo - timedelta(days=self._max_len)
+        )
+        last = bisect.bisect_right(self._begins, hi)
+        return [self._ids[j] for j in range(first, last)
+                if self._ends[j] >= lo]
@@ -0,0 +1,125 @@
+import bisect
+
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .split import Item, Solution, forward_tables, top
+
+
+class WindowIndex:
+    """
+    Answers "best plan inside [start, end]" queries over a fixed set of
+    items, spending at most a PTO budget in at most a number of periods.
+
+    Single-break queries use a sparse table: the node of level l at i
+    holds, for every budget b, the best item of items[i:i + 2**l] using at
+    most b PTO, so the fully inside part of a window is two lookups. Only
+    the items ending less than the longest item after the window start
+    can straddle it, and those are checked one by one. Multi-break
+    queries run the DP of split.forward_tables on the window's items only,
+    so they cost O(window items x budget x periods), not sublinear time.
+
+    items must be sorted by (end, begin) with index equal to position.
+    """
+    def __init__(self, items: List[Item], max_pto: int, min_gap: int):
+        self.items = items
+        self.max_pto = max_pto
+        self.min_gap = min_gap
+        self._ends = [it.end for it in items]
+        self._max_len = max((it.end - it.begin for it in items), default=0)
+        self._table: Optional[List[List[array]]] = None
+
+    def _better(self, i: int, j: int) -> bool:
+        """ True if item i beats item j (-1 stands for no item). """
+        if i < 0:
+            return False
+        if j < 0:
+            return True
+        # Ties go to the earliest item, as in the DP
+        return (self.items[i].score, -i) > (self.items[j].score, -j)
+
+    def _merge(self, a: array, b: array) -> array:
+        return array('i', (x if self._better(x, y) else y
+                           for x, y in zip(a, b)))
+
+    def _build(self) -> List[List[array]]:
+        if self._table is None:
+            width = self.max_pto + 1
+            level = [array('i', [-1] * min(it.pto, width)
+                           + [it.index] * max(width - it.pto, 0))
+                     for it in self.items]
+            table = [level]
+            size = 1
+            while 2 * size <= len(self.items):
+                level = [self._merge(level[i], level[i + size])
+                         for i in range(len(self.items) - 2 * size + 1)]
+                table.append(level)
+                size *= 2
+            self._table = table
+        return self._table
+
+    def _bounds(self, start: int, end: int):
+        lo = bisect.bisect_left(self._ends, start)
+        hi = bisect.bisect_right(self._ends, end)
+        # items[inner:hi] begin on or after start
+        inner = min(max(bisect.bisect_left(self._ends,
+                                           start + self._max_len), lo), hi)
+        return lo, inner, hi
+
+    def inside(self, start: int, end: int) -> List[int]:
+        """ Indices of the items inside [start, end]. """
+        lo, inner, hi = self._bounds(start, end)
+        return [i for i in range(lo, inner)
+                if self.items[i].begin >= start] + list(range(inner, hi))
+
+    def best_single(self, start: int, end: int, budget: int) -> Optional[int]:
+        """ Index of the best item inside [start, end] using <= budget PTO. """
+        budget = min(budget, self.max_pto)
+        if budget <= 0:
+            return None
+        lo, inner, hi = self._bounds(start, end)
+        best = -1
+        for i in range(lo, inner):
+            it = self.items[i]
+            if it.begin >= start and it.pto <= budget \
+                    and self._better(i, best):
+                best = i
+        if inner < hi:
+            table = self._build()
+            level = (hi - inner).bit_length() - 1
+            nodes = table[level]
+            for j in (nodes[inner][budget], nodes[hi - (1 << level)][budget]):
+                if self._better(j, best):
+                    best = j
+        return best if best >= 0 else None
+
+    def window_table(self, start: int, end: int, budget: int,
+                     periods: int) -> Dict[Tuple[int, int], Solution]:
+        """
+        Best (score, path) inside [start, end] for every (PTO, periods)
+        cell up to budget and periods, the empty plan included. Runs the
+        full DP on the window's items: O(window items x budget x periods).
+        """
+        window = [self.items[i] for i in self.inside(start, end)]
+        local = [Item(j, it.begin, it.end, it.pto, it.score)
+                 for j, it in enumerate(window)]
+        table = forward_tables(local, budget, periods, 1, self.min_gap,
+                               {len(local)})[len(local)]
+        return {cell: (sols[0][0], tuple(window[j].index
+                                         for j in sols[0][1]))
+                for cell, sols in table.items()}
+
+    def best_plan(self, start: int, end: int, budget: int,
+                  periods: int) -> Optional[Solution]:
+        """
+        Best (score, path) inside [start, end] with <= budget PTO in <=
+        periods breaks; paths hold item indices in decreasing order. Only
+        single-break queries use the sparse table; longer ones cost as
+        much as window_table.
+        """
+        if periods == 1:
+            i = self.best_single(start, end, budget)
+            return None if i is None else (self.items[i].score, (i,))
+        table = self.window_table(start, end, budget, periods)
+        found = top((sol for (p, k), sol in table.items() if k > 0), 1)
+        return found[0] if found else None
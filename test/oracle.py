@@ -0,0 +1,366 @@
+"""
+Differential fuzzing of the engines against an exhaustive oracle.
+
+Run by test_oracle.py, or on its own to replay a failure:
+python test/oracle.py --cases 200 --seed 0
+"""
+import argparse
+import random
+import sys
+import time
+
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from vacationextender.core import Result, VacationExtender
+from vacationextender.mycalendar import Break, Calendar, FORBIDDEN, HOLIDAY
+
+dDAY = timedelta(days=1)
+
+# Engines (or engines answering for auto and portfolio) that must match
+# the oracle exactly; the others are heuristics
+EXACT_ENGINES = ('optimal', 'day_dp', 'split')
+HEURISTICS = ('greedy', 'lns')
+# 'split' is the optimal engine with the rows split over two workers
+ENGINES = ('optimal', 'day_dp', 'split', 'auto', 'portfolio') + HEURISTICS
+# Scores are compared at this precision (weights are floats)
+DIGITS = 6
+
+# (score, plan) with the breaks of the plan in date order
+Plan = Tuple[float, List[Break]]
+
+
+class EngineStats(NamedTuple):
+    """ Totals of one engine over a fuzz run. """
+    seconds: float
+    cases: int
+    # Cases whose top scores differ from the oracle (exact engines only)
+    mismatches: int
+    # Plans breaking a rule the engine enforces
+    invalid: int
+    # Sum of best score / oracle best score, for the mean gap
+    ratio: float
+
+
+class FuzzReport(NamedTuple):
+    cases: int
+    # Cases rejected by _check_config, not checked
+    skipped: int
+    oracle_seconds: float
+    engines: Dict[str, EngineStats]
+    # One line per failing (case, engine), with the seed to replay it
+    failures: List[str]
+
+
+def random_case(rng: random.Random) -> Tuple[dict, Calendar]:
+    """
+    A small random calendar (3 to 8 weeks of a Brazilian year, with extra
+    holidays, forced work days and half days) and a config exercising the
+    per-break limits, min_gap_days, anchors, mandatory days and months.
+    """
+    year = rng.randint(2025, 2030)
+    first = date(year, 1, 1) + rng.randint(0, 300) * dDAY
+    last = first + rng.randint(20, 55) * dDAY
+    days = [first + i * dDAY for i in range((last - first).days + 1)]
+    custom = rng.sample(days, rng.randint(0, 4))
+    forbidden = set(rng.sample(days, rng.choice([0, 0, 1, 3])))
+    free = [d for d in days if d not in forbidden]
+    constraints = {
+        'vacation_days': rng.randint(2, 9),
+        'max_vac_periods': rng.randint(1, 3),
+        'min_gap_days': rng.choice([0, 0, 2, 7]),
+        'in_holiday_as_pto': rng.random() < 0.3,
+        'top_n_suggestions': rng.choice([1, 1, 2]),
+        'custom_holidays': [d.isoformat() for d in custom],
+        'forced_work': [d.isoformat() for d in sorted(forbidden)],
+    }
+    if rng.random() < 0.25:
+        constraints['pto_unit'] = rng.choice([0.5, 0.5, 0.25])
+        constraints['half_days'] = [d.isoformat() for d in
+                                    rng.sample(free, rng.randint(0, 4))]
+        constraints['vacation_days'] += rng.choice([0, 0.5])
+    if rng.random() < 0.3:
+        constraints['max_vac_days_per_break'] = rng.randint(1, 6)
+    if rng.random() < 0.2:
+        constraints['min_vac_days_per_break'] = rng.randint(1, 3)
+    if rng.random() < 0.2:
+        constraints['min_total_days_off'] = rng.randint(2, 6)
+    if rng.random() < 0.2:
+        constraints['max_total_days_off'] = rng.randint(4, 15)
+    for name in ('must_start_on', 'must_end_on', 'must_be_vacation'):
+        if rng.random() < 0.15:
+            constraints[name] = [rng.choice(free).isoformat()]
+    months = sorted({d.month for d in days})
+    if rng.random() < 0.15:
+        constraints['required_months'] = [rng.choice(months)]
+    if rng.random() < 0.15:
+        constraints['start_months'] = [rng.choice(months)]
+    config = {
+        'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+        'CONSTRAINTS': constraints,
+        'ALGORITHM': {'lns_seconds': 0.05, 'seed': rng.randint(0, 1000)},
+    }
+    if rng.random() < 0.2:
+        day = rng.choice(days)
+        config['WEIGHTS'] = {day.isoformat(): rng.choice([0.5, 2.0, 3.0])}
+    calendar = Calendar('BR', None, first, last, None, custom, forbidden)
+    return config, calendar
+
+
+def anchors(ve: VacationExtender) -> Tuple[List[date], List[date]]:
+    """
+    must_start_on (must_end_on) dates moved over the holidays before
+    (after) them: a break is always extended over adjacent holidays.
+    """
+    starts, ends = [], []
+    for day in ve.start_days:
+        while day - dDAY in ve.calendar \
+                and ve.calendar[day - dDAY].is_holiday():
+            day -= dDAY
+        starts.append(day)
+    for day in ve.end_days:
+        while day + dDAY in ve.calendar \
+                and ve.calendar[day + dDAY].is_holiday():
+            day += dDAY
+        ends.append(day)
+    return starts, ends
+
+
+def universe(ve: VacationExtender) -> List[Break]:
+    """
+    Every break the model allows, found without the candidate scan: each
+    span without forced work, extended over adjacent holidays, that
+    starts or ends on a holiday (or on an anchor) and passes the
+    per-break limits.
+    """
+    compact = ve.calendar.compact()
+    types = compact.types
+    limits = ve.limits()
+    starts, ends = ({compact.index(day) for day in days}
+                    for days in anchors(ve))
+    found = dict()
+    for b in range(len(types)):
+        for e in range(b, len(types)):
+            if types[e] == FORBIDDEN:
+                break
+            span = compact.span(b, e, ve.holiday_as_pto)
+            if span is None or span[:2] in found:
+                continue
+            begin, end, _, _, units, _ = span
+            if not (types[begin] == HOLIDAY or types[end] == HOLIDAY
+                    or begin in starts or end in ends):
+                continue
+            if not (limits.min_vac_break <= units
+                    <= min(limits.max_vac_break, limits.days)
+                    and ve.min_tot_break <= end - begin + 1
+                    <= ve.max_tot_break):
+                continue
+            found[span[:2]] = ve.calendar.make_break(span, ve.alpha,
+                                                     ve.weights, ve._step)
+    return sorted(found.values(), key=lambda br: br.begin)
+
+
+def path_violations(ve: VacationExtender, plan: Sequence[Break]) -> List[str]:
+    """ Anchors, mandatory days and months the plan does not satisfy. """
+    reasons = []
+    for day in ve.must_be:
+        if not any(day in br for br in plan):
+            reasons.append(f"must_be_vacation {day} not covered")
+    starts, ends = anchors(ve)
+    for day in starts:
+        if not any(br.begin.date() == day for br in plan):
+            reasons.append(f"no break starts on {day}")
+    for day in ends:
+        if not any(br.end.date() == day for br in plan):
+            reasons.append(f"no break ends on {day}")
+    for month in ve.months:
+        if not any(br.begin.date().month == month == br.end.date().month
+                   for br in plan):
+            reasons.append(f"no break inside month {month}")
+    for month in ve.start_months:
+        if not any(br.begin.date().month == month for br in plan):
+            reasons.append(f"no break starting in month {month}")
+    return reasons
+
+
+def rule_violations(ve: VacationExtender, plan: Sequence[Break],
+                    exact: bool) -> List[str]:
+    """
+    Budget, periods, forced work, per-break limits and gaps. Exact plans
+    spend exactly vacation_days in exactly max_vac_periods breaks.
+    """
+    reasons = []
+    plan = sorted(plan, key=lambda br: br.begin)
+    units = sum(br.pto_units for br in plan)
+    budget = ve._units(ve.days)
+    if units > budget or (exact and units != budget):
+        reasons.append(f"spends {units} of {budget} PTO units")
+    if len(plan) > ve.n_breaks or (exact and len(plan) != ve.n_breaks):
+        reasons.append(f"has {len(plan)} of {ve.n_breaks} periods")
+    for br in plan:
+        if any(day in br for day in ve.forbidden):
+            reasons.append(f"break {br.begin}:{br.end} has forced work")
+        if not ve.min_vac_break <= br.days_pto <= ve.max_vac_break:
+            reasons.append(f"break {br.begin}:{br.end} PTO out of limits")
+        if not ve.min_tot_break <= br.total <= ve.max_tot_break:
+            reasons.append(f"break {br.begin}:{br.end} total out of limits")
+    for prev, br in zip(plan, plan[1:]):
+        if (br.begin.date() - prev.end.date()).days <= ve.min_gap:
+            reasons.append(f"breaks {prev.begin} and {br.begin} closer than "
+                           f"min_gap_days")
+    return reasons
+
+
+def oracle(ve: VacationExtender) -> List[Plan]:
+    """
+    All plans spending exactly vacation_days in exactly max_vac_periods
+    breaks of universe() and meeting every constraint, best first.
+    """
+    breaks = universe(ve)
+    plans: List[Plan] = []
+
+    def extend(path: List[Break], start: int, cost: int, score: float):
+        if len(path) == ve.n_breaks:
+            if cost == ve.budget and not path_violations(ve, path):
+                plans.append((round(score, DIGITS), list(path)))
+            return
+        for i in range(start, len(breaks)):
+            br = breaks[i]
+            if cost + br.cost > ve.budget:
+                continue
+            if path and (br.begin.date()
+                         - path[-1].end.date()).days <= ve.min_gap:
+                continue
+            path.append(br)
+            extend(path, i + 1, cost + br.cost, score + br.value)
+            path.pop()
+
+    extend([], 0, 0, 0.0)
+    plans.sort(key=lambda x: x[0], reverse=True)
+    return plans
+
+
+def run_engine(ve: VacationExtender, engine: str) -> Result:
+    """ Solves ve with engine; 'split' solves a copy with two workers. """
+    if engine != 'split':
+        return ve.solve(algorithm=engine)
+    config = dict(ve.config, ALGORITHM=dict(ve.config.get('ALGORITHM', {}),
+                                            workers=2))
+    return VacationExtender(config_data=config,
+                            calendar=ve.calendar).solve(algorithm='optimal')
+
+
+def check_engine(ve: VacationExtender, engine: str,
+                 expected: List[Plan]) -> Tuple[float, Optional[float],
+                                                List[str]]:
+    """
+    Solves ve with engine and compares it with the oracle plans. Returns
+    the seconds taken, the best score and the problems found.
+    """
+    start = time.perf_counter()
+    result = run_engine(ve, engine)
+    seconds = time.perf_counter() - start
+    exact = engine in EXACT_ENGINES or result.engine in EXACT_ENGINES
+    scores = [round(sum(br.value for br in plan), DIGITS)
+              for plan in result.plans]
+    problems = []
+    if exact:
+        wanted = [score for score, _ in expected[:ve.top_n]]
+        if scores != wanted:
+            problems.append(f"top scores {scores[:5]} != {wanted[:5]}")
+    elif expected and not result.plans:
+        problems.append("no plan although one exists")
+    for plan in result.plans:
+        reasons = rule_violations(ve, plan, exact)
+        if exact:
+            reasons += path_violations(ve, plan)
+        problems += reasons
+    return seconds, scores[0] if scores else None, problems
+
+
+def fuzz(cases: int = 100, seed: int = 0,
+         engines: Sequence[str] = ENGINES, log=None) -> FuzzReport:
+    """
+    Checks engines against the oracle on random small cases. Exact
+    engines, and auto and portfolio when an exact engine answers, must
+    return the oracle's top scores with valid plans; greedy and lns must
+    return valid plans (they do not enforce anchors, mandatory days or
+    months) and their score ratio is reported. log, if given, is called
+    with each failure as it is found.
+    """
+    stats = {engine: [0.0, 0, 0, 0, 0.0] for engine in engines}
+    failures = []
+    skipped = 0
+    oracle_seconds = 0.0
+    for case in range(cases):
+        rng = random.Random(f'{seed}:{case}')
+        config, calendar = random_case(rng)
+        ve = VacationExtender(config_data=config, calendar=calendar)
+        if ve._check_config():
+            skipped += 1
+            continue
+        start = time.perf_counter()
+        expected = oracle(ve)
+        oracle_seconds += time.perf_counter() - start
+        for engine in engines:
+            seconds, best, problems = check_engine(ve, engine, expected)
+            entry = stats[engine]
+            entry[0] += seconds
+            entry[1] += 1
+            if any(p.startswith('top scores') or (
+                    p.startswith('no plan') and engine not in HEURISTICS)
+                   for p in problems):
+                entry[2] += 1
+            if any(not p.startswith(('top scores', 'no plan'))
+                   for p in problems):
+                entry[3] += 1
+            if expected and best is not None:
+                entry[4] += best / expected[0][0]
+            elif not expected and best is None:
+                entry[4] += 1.0
+            if problems:
+                failure = f"seed {seed} case {case} {engine}: " \
+                          f"{'; '.join(problems[:3])}"
+                failures.append(failure)
+                if log is not None:
+                    log(failure)
+    return FuzzReport(cases, skipped, oracle_seconds,
+                      {engine: EngineStats(*entry)
+                       for engine, entry in stats.items()}, failures)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check the engines against exhaustive search on "
+                    "random cases")
+    parser.add_argument("--cases", type=int, default=200,
+                        help="Random cases to check (default: 200)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the cases, to replay a failure "
+                             "(default: 0)")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES),
+                        help=f"Engines to check (default: "
+                             f"{' '.join(ENGINES)})")
+    args = parser.parse_args()
+    report = fuzz(args.cases, args.seed, args.engines)
+    print(f"{report.cases - report.skipped} of {report.cases} cases checked "
+          f"(seed {args.seed}), {report.skipped} skipped by _check_config, "
+          f"oracle {report.oracle_seconds:.2f}s")
+    print(f"{'engine':<10}{'seconds':>9}{'mismatch':>10}{'invalid':>9}"
+          f"{'ratio':>8}")
+    for engine, stats in report.engines.items():
+        ratio = stats.ratio / stats.cases if stats.cases else 0.0
+        mismatches = '-' if engine in HEURISTICS else stats.mismatches
+        print(f"{engine:<10}{stats.seconds:>9.2f}{mismatches:>10}"
+              f"{stats.invalid:>9}{ratio:>8.3f}")
+    for failure in report.failures:
+        print(f"❌ {failure}")
+    failed = any(stats.invalid or stats.mismatches
+                 for stats in report.engines.values())
+    if not failed:
+        print("✅ No engine broke a rule or missed the exact optimum.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
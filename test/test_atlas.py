@@ -0,0 +1,16 @@
+from vacationextender.atlas import atlas_keys
+from vacationextender.countries import supported_countries
+
+
+def test_full_sweep_solves_each_country_once():
+    keys = atlas_keys([2027])
+    assert len(keys) == len(set(keys))
+    countries = {country for country, _, _ in keys}
+    assert 'BR' in countries and 'BRA' not in countries
+    assert countries == set(supported_countries(include_aliases=False))
+    assert len(supported_countries()) > len(countries)
+
+
+def test_explicit_alias_is_still_swept():
+    keys = atlas_keys([2027], ['BRA'])
+    assert ('BRA', None, 2027) in keys
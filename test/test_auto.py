@@ -0,0 +1,27 @@
+from vacationextender import VacationExtender
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 20, 'max_vac_periods': 3},
+    'ALGORITHM': {'algorithm_type': 'auto'},
+}
+
+
+def test_auto_picks_day_dp_when_cheaper():
+    extender = VacationExtender(config_data=CONFIG)
+    result = extender.solve()
+    assert result.engine == 'day_dp'
+    assert result.cost_estimate['day_dp_seconds'] \
+        < result.cost_estimate['seconds']
+    optimal = extender.solve(algorithm='optimal')
+    assert [sum(br.value for br in plan) for plan in result.plans] \
+        == [sum(br.value for br in plan) for plan in optimal.plans]
+
+
+def test_auto_skips_day_dp_with_anchors():
+    config = dict(CONFIG, CONSTRAINTS=dict(
+        CONFIG['CONSTRAINTS'], must_start_on=['2027-07-05']))
+    result = VacationExtender(config_data=config).solve()
+    assert result.engine == 'optimal'
+    assert 'day_dp_seconds' not in result.cost_estimate
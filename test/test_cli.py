@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def test_countries_command_does_not_import_core():
+    # A fresh interpreter, as sys.modules here already holds core
+    code = ("import sys\n"
+            "sys.argv = ['vacationext', 'countries', 'BR']\n"
+            "from vacationextender.main import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('vacationextender.core' in sys.modules)\n")
+    result = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=SRC))
+    assert 'SP' in result.stdout
+    assert result.stdout.splitlines()[-1] == 'False'
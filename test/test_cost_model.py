@@ -0,0 +1,47 @@
+import pytest
+
+from vacationextender import VacationExtender
+from vacationextender.core import DP_CONSTRAINED_BLOWUP, SECONDS_PER_DP_UNIT
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 20, 'max_vac_periods': 3},
+}
+
+
+def estimate(**constraints):
+    config = dict(CONFIG, CONSTRAINTS=dict(CONFIG['CONSTRAINTS'],
+                                           **constraints))
+    extender = VacationExtender(config_data=config)
+    breaks = extender.prepare()
+    return extender, breaks, extender._estimate_cost(breaks)
+
+
+def test_units_count_candidate_budget_period_cells():
+    extender, breaks, cost = estimate()
+    assert cost['candidates'] == len(breaks)
+    assert cost['units'] == len(breaks) * 21 * 3 * extender.top_n
+    assert cost['seconds'] == pytest.approx(
+        cost['units'] * SECONDS_PER_DP_UNIT)
+
+
+@pytest.mark.parametrize('constraints', [
+    {'must_be_vacation': ['2027-08-10']},
+    {'required_months': [7], 'start_months': [12]},
+    {'must_start_on': ['2027-07-05'], 'must_end_on': ['2027-10-15']},
+])
+def test_path_constraints_multiply_the_units(constraints):
+    extender, breaks, cost = estimate(**constraints)
+    assert extender._has_path_constraints()
+    assert cost['units'] == pytest.approx(
+        len(breaks) * 21 * 3 * extender.top_n * DP_CONSTRAINED_BLOWUP)
+    assert 'day_dp_units' not in cost
+
+
+def test_units_grow_with_budget_and_periods():
+    _, _, small = estimate()
+    _, _, budget = estimate(vacation_days=30)
+    _, _, periods = estimate(max_vac_periods=5)
+    assert budget['units'] > small['units']
+    assert periods['units'] > small['units']
@@ -0,0 +1,65 @@
+import random
+
+from datetime import date, timedelta
+
+import pytest
+
+from vacationextender import VacationExtender, evaluate_plans
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 20, 'max_vac_periods': 3,
+                    'min_gap_days': 5, 'forced_work': ['2027-03-10']},
+}
+
+
+def extender(**constraints):
+    config = dict(CONFIG, CONSTRAINTS=dict(CONFIG['CONSTRAINTS'],
+                                           **constraints))
+    return VacationExtender(config_data=config)
+
+
+@pytest.mark.parametrize('holiday_as_pto', [False, True])
+def test_random_spans_match_new_break(holiday_as_pto):
+    ve = extender(in_holiday_as_pto=holiday_as_pto)
+    rng = random.Random(0)
+    plans = dict()
+    for person in range(300):
+        begin = date(2027, 1, 1) + timedelta(days=rng.randrange(340))
+        plans[person] = [(begin, begin + timedelta(days=rng.randrange(20)))]
+    evaluations = evaluate_plans(ve, plans)
+    for person, (begin, end) in ((p, plan[0]) for p, plan in plans.items()):
+        span = evaluations[person].spans[0]
+        br = ve.calendar.new_break(begin, end, holiday_as_pto, ve.alpha)
+        if br is None:
+            assert span.pto == 0
+            continue
+        assert (span.begin, span.end) == (br.begin.date(), br.end.date())
+        assert span.pto == br.days_pto
+        assert span.total == br.total
+        assert span.roi == pytest.approx(br.roi)
+        assert span.value == br.value
+        assert evaluations[person].pto == br.days_pto
+
+
+def test_breaks_too_close_fail_the_gap():
+    ve = extender()
+    # Two weeks from Monday to Friday, three days apart
+    close = [(date(2027, 5, 3), date(2027, 5, 7)),
+             (date(2027, 5, 10), date(2027, 5, 14))]
+    apart = [(date(2027, 5, 3), date(2027, 5, 7)),
+             (date(2027, 5, 17), date(2027, 5, 21))]
+    evaluations = evaluate_plans(ve, {'close': close, 'apart': apart})
+    assert [s.gap_ok for s in evaluations['close'].spans] == [True, False]
+    assert not evaluations['close'].valid
+    assert [s.gap_ok for s in evaluations['apart'].spans] == [True, True]
+    assert evaluations['apart'].valid
+
+
+def test_forced_work_inside_a_break_is_counted():
+    ve = extender()
+    evaluation = evaluate_plans(
+        ve, {'me': [(date(2027, 3, 8), date(2027, 3, 12))]})['me']
+    assert evaluation.spans[0].forced_work == 1
+    assert not evaluation.valid
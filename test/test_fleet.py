@@ -0,0 +1,51 @@
+from datetime import date
+
+from vacationextender import CalendarDelta, VacationExtender, replan
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 1, 'max_vac_periods': 1},
+}
+
+
+def spans(result):
+    return [[(br.begin.date(), br.end.date()) for br in plan]
+            for plan in result.plans]
+
+
+def test_added_holiday_far_from_plans_is_resolved():
+    result = VacationExtender(config_data=CONFIG).solve()
+    assert spans(result)[0] == [(date(2027, 1, 1), date(2027, 1, 4))]
+    delta = CalendarDelta(added=(date(2027, 8, 9), date(2027, 8, 11)))
+    report = replan({'a': (CONFIG, result)}, delta)
+    fresh = VacationExtender(config_data=report.configs['a']).solve()
+    assert report.resolved == ['a']
+    assert report.changed == ['a']
+    assert spans(report.results['a']) == spans(fresh)
+    assert sum(br.value for br in fresh.plans[0]) == 5
+
+
+def test_removed_holiday_far_from_plans_keeps_them():
+    config = dict(CONFIG, CONSTRAINTS=dict(
+        CONFIG['CONSTRAINTS'], custom_holidays=['2027-08-11']))
+    result = VacationExtender(config_data=config).solve()
+    delta = CalendarDelta(removed=(date(2027, 8, 11),))
+    report = replan({'a': (config, result)}, delta)
+    fresh = VacationExtender(config_data=report.configs['a']).solve()
+    assert report.resolved == []
+    assert sum(br.value for br in report.results['a'].plans[0]) \
+        == sum(br.value for br in fresh.plans[0])
+
+
+def test_moved_library_holiday_is_applied():
+    delta = CalendarDelta(added=(date(2027, 4, 23),),
+                          removed=(date(2027, 4, 21),))
+    result = VacationExtender(config_data=CONFIG).solve()
+    report = replan({'a': (CONFIG, result)}, delta)
+    config = report.configs['a']
+    assert config['CONSTRAINTS']['removed_holidays'] == ['2027-04-21']
+    assert config['CONSTRAINTS']['custom_holidays'] == ['2027-04-23']
+    calendar = VacationExtender(config_data=config).calendar
+    assert not calendar[date(2027, 4, 21)].is_holiday()
+    assert calendar[date(2027, 4, 23)].is_holiday()
@@ -0,0 +1,26 @@
+from vacationextender import VacationExtender
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 30, 'max_vac_periods': 3,
+                    'max_vac_days_per_break': 10},
+}
+
+
+def test_greedy_spends_the_budget_with_tight_break_limits():
+    extender = VacationExtender(config_data=CONFIG)
+    greedy = extender.solve(algorithm='greedy')
+    optimal = extender.solve(algorithm='optimal')
+    assert [br.days_pto for br in greedy.plans[0]] == [10, 10, 10]
+    assert sum(br.value for br in greedy.plans[0]) \
+        <= sum(br.value for br in optimal.plans[0])
+
+
+def test_unspendable_budget_is_reported_for_greedy():
+    config = dict(CONFIG, CONSTRAINTS=dict(
+        CONFIG['CONSTRAINTS'], max_vac_periods=4, max_vac_days_per_break=5))
+    result = VacationExtender(config_data=config).solve(algorithm='greedy')
+    assert result.plans == []
+    assert result.infeasible == [
+        "4 periods of at most 5 PTO days cannot spend vacation_days (30)"]
@@ -0,0 +1,41 @@
+import holidays as hd
+
+from vacationextender import countries
+from vacationextender.holidaybundle import HolidayBundle, build_bundle
+
+LOCATIONS = [('BR', None), ('BR', 'SP'), ('US', 'CA'), ('DE', 'BY')]
+
+
+def library_holidays(country, subdivision, years):
+    return sorted(hd.country_holidays(country=country, subdiv=subdivision,
+                                      years=years, observed=True).keys())
+
+
+def test_lookup_matches_the_library(tmp_path, capsys):
+    path = str(tmp_path / 'holidays.vxh')
+    assert build_bundle(path, LOCATIONS, 2026, 2028) == len(LOCATIONS)
+    bundle = HolidayBundle(path)
+    try:
+        assert capsys.readouterr().out == ''
+        assert sorted(bundle.locations(), key=str) == sorted(LOCATIONS,
+                                                             key=str)
+        for country, subdivision in LOCATIONS:
+            for years in ({2026}, {2027}, {2026, 2028}, {2026, 2027, 2028}):
+                found = bundle.lookup(country, subdivision, years)
+                assert found == library_holidays(country, subdivision,
+                                                 sorted(years))
+            # Calendars extend what they get with their custom holidays
+            assert bundle.lookup(country, subdivision, {2027}) \
+                is not bundle.lookup(country, subdivision, {2027})
+        assert bundle.lookup('BR', None, {2029}) is None
+        assert bundle.lookup('BR', 'RJ', {2027}) is None
+    finally:
+        bundle.close()
+
+
+def test_other_holidays_version_warns(tmp_path, capsys, monkeypatch):
+    path = str(tmp_path / 'holidays.vxh')
+    build_bundle(path, LOCATIONS[:1], 2027, 2027)
+    monkeypatch.setattr(countries, 'holidays_version', lambda: '0.0')
+    HolidayBundle(path).close()
+    assert 'holidays 0.0 is installed' in capsys.readouterr().out
@@ -0,0 +1,7 @@
+from oracle import fuzz
+
+
+def test_engines_match_the_oracle():
+    report = fuzz(cases=40, seed=0)
+    assert report.failures == []
+    assert report.skipped < report.cases
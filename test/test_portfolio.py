@@ -0,0 +1,52 @@
+import multiprocessing
+import time
+
+import pytest
+
+from vacationextender import VacationExtender
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 10, 'max_vac_periods': 2},
+    'ALGORITHM': {'algorithm_type': 'portfolio',
+                  'portfolio_engines': ['greedy', 'lns'], 'workers': 2,
+                  'lns_seconds': 0.1},
+}
+
+FORKED = pytest.mark.skipif(
+    multiprocessing.get_context().get_start_method() != 'fork',
+    reason="workers only see the patched engine when forked")
+
+
+@FORKED
+def test_worker_errors_are_reported(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(VacationExtender, '_run_greedy', fail)
+    result = VacationExtender(config_data=CONFIG).solve()
+    assert result.plans == []
+    assert result.infeasible == ['every engine of the portfolio failed',
+                                 'greedy: RuntimeError: boom',
+                                 'lns: RuntimeError: boom']
+    assert result.race['greedy'][2] == 'RuntimeError: boom'
+
+
+@FORKED
+def test_deadline_terminates_the_workers(monkeypatch):
+    def stall(*args, **kwargs):
+        time.sleep(60)
+
+    monkeypatch.setattr(VacationExtender, '_run_greedy', stall)
+    monkeypatch.setattr(VacationExtender, '_run_lns', stall)
+    config = dict(CONFIG, ALGORITHM=dict(CONFIG['ALGORITHM'],
+                                         max_seconds=0.5))
+    start = time.time()
+    result = VacationExtender(config_data=config).solve()
+    assert time.time() - start < 30
+    assert result.plans == []
+    assert result.infeasible == [
+        'no engine of the portfolio finished within max_seconds (0.5 s)']
+    assert result.race == {'greedy': (None, None, None),
+                           'lns': (None, None, None)}
@@ -0,0 +1,23 @@
+from vacationextender import VacationExtender
+
+CONSTRAINTS = {'vacation_days': 20.5, 'pto_unit': 0.5}
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+}
+
+
+def test_fractional_budget_without_half_days_is_infeasible():
+    config = dict(CONFIG, CONSTRAINTS=CONSTRAINTS)
+    result = VacationExtender(config_data=config).solve()
+    assert result.plans == []
+    assert result.infeasible == [
+        "vacation_days 20.5 cannot be spent in whole days off"]
+
+
+def test_fractional_budget_is_spent_with_half_days():
+    config = dict(CONFIG, CONSTRAINTS=dict(
+        CONSTRAINTS, half_days=['2027-12-24', '2027-12-31']))
+    result = VacationExtender(config_data=config).solve()
+    assert result.infeasible == []
+    assert sum(br.days_pto for br in result.plans[0]) == 20.5
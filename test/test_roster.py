@@ -0,0 +1,14 @@
+from datetime import date
+
+from vacationextender import VacationExtender
+
+
+def test_roster_anchor_defaults_to_january_first():
+    year = date.today().year
+    config = {
+        'calendar': {'year': year},
+        'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+        'ROSTER': {'pattern': '11110000'},
+    }
+    extender = VacationExtender(config_data=config)
+    assert extender.roster.anchor == date(year, 1, 1)
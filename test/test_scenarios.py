@@ -0,0 +1,45 @@
+import multiprocessing
+
+import pytest
+
+from vacationextender import VacationExtender
+from vacationextender.scenarios import scenario_grid, solve_scenarios
+
+CONFIG = {
+    'calendar': {'year': 2027},
+    'LOCATION': {'country_code': 'BR', 'subdivision_code': None},
+    'CONSTRAINTS': {'vacation_days': 10, 'max_vac_periods': 2},
+}
+
+VARIANTS = scenario_grid({
+    'CONSTRAINTS.in_holiday_as_pto': [False, True],
+    'CONSTRAINTS.max_vac_days_per_break': [5, 10],
+    'ALGORITHM.duration_weight_factor_alpha': [0.5, 1.0],
+})
+
+
+def candidate_key(br):
+    return (br.begin.date(), br.end.date(), br.begin_pto.date(),
+            br.end_pto.date(), br.days_pto, br.value)
+
+
+@pytest.mark.parametrize('workers', [
+    1,
+    pytest.param(2, marks=pytest.mark.skipif(
+        multiprocessing.get_context().get_start_method() != 'fork',
+        reason="workers only see the patched solve when forked")),
+])
+def test_shared_candidates_match_a_separate_prepare(monkeypatch, workers):
+    solve = VacationExtender.solve
+
+    def recording_solve(self, *args, **kwargs):
+        result = solve(self, *args, **kwargs)
+        result.candidates = [candidate_key(br) for br in self.candidates]
+        return result
+
+    monkeypatch.setattr(VacationExtender, 'solve', recording_solve)
+    for scenario in solve_scenarios(CONFIG, VARIANTS, workers):
+        alone = VacationExtender(config_data=scenario.config)
+        expected = [candidate_key(br) for br in alone.prepare()]
+        assert expected
+        assert scenario.result.candidates == expected
@@ -0,0 +1,60 @@
+import random
+
+from itertools import combinations
+
+import pytest
+
+from vacationextender.split import Item
+from vacationextender.window import WindowIndex
+
+MIN_GAP = 2
+
+
+def random_items(rng, n):
+    spans = []
+    for _ in range(n):
+        begin = rng.randrange(60)
+        spans.append((begin + rng.randrange(10), begin))
+    return [Item(i, begin, end, rng.randrange(1, 6),
+                 round(rng.uniform(1, 20), 3))
+            for i, (end, begin) in enumerate(sorted(spans))]
+
+
+def brute_force(items, start, end, budget, periods):
+    """ Best score of every (PTO, periods) cell, by enumeration. """
+    inside = [it for it in items if it.begin >= start and it.end <= end]
+    best = {(0, 0): 0}
+    for k in range(1, periods + 1):
+        for plan in combinations(inside, k):
+            pto = sum(it.pto for it in plan)
+            ordered = sorted(plan, key=lambda it: it.begin)
+            if pto > budget or any(b.begin - a.end <= MIN_GAP for a, b
+                                   in zip(ordered, ordered[1:])):
+                continue
+            score = sum(it.score for it in plan)
+            best[pto, k] = max(best.get((pto, k), score), score)
+    return best
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_queries_match_brute_force(seed):
+    rng = random.Random(seed)
+    items = random_items(rng, 14)
+    index = WindowIndex(items, 5, MIN_GAP)
+    for _ in range(10):
+        start = rng.randrange(50)
+        end = start + rng.randrange(40)
+        budget = rng.randrange(10)
+        periods = rng.randrange(1, 4)
+        expected = brute_force(items, start, end, budget, periods)
+        table = index.window_table(start, end, budget, periods)
+        assert {cell: sol[0] for cell, sol in table.items()} \
+            == pytest.approx(expected)
+        for score, path in table.values():
+            assert sum(items[i].score for i in path) == pytest.approx(score)
+        best = index.best_plan(start, end, budget, periods)
+        scores = [s for (_, k), s in expected.items() if k > 0]
+        if not scores:
+            assert best is None
+        else:
+            assert best[0] == pytest.approx(max(scores))